@@ -0,0 +1,124 @@
+"""
+Requests/sec of the same read endpoint served through the sync path (def + SessionLocal,
+runs in the threadpool) and the async path (async def + AsyncSessionLocal / aiosqlite),
+at high client concurrency against a single uvicorn worker:
+
+    python -m benchmarks.async_reads --concurrency 200 --seconds 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+def _serve(port: int) -> None:
+    import uvicorn
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+    from core.database import get_async_db, get_db
+    from models import Message
+    from schemas import MessageResponse
+
+    app = FastAPI()
+
+    def page_query():
+        return (
+            select(Message)
+            .where(Message.status == "approved")
+            .order_by(Message.approved_at.desc(), Message.id.desc())
+            .limit(20)
+        )
+
+    @app.get("/sync", response_model=list[MessageResponse])
+    def sync_page(db: Session = Depends(get_db)):
+        return db.scalars(page_query()).all()
+
+    @app.get("/async", response_model=list[MessageResponse])
+    async def async_page(db: AsyncSession = Depends(get_async_db)):
+        return (await db.scalars(page_query())).all()
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+async def _load(url: str, concurrency: int, seconds: float) -> dict:
+    import httpx
+
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def user():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                except httpx.HTTPError:
+                    errors += 1
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / seconds,
+        "p50": statistics.median(latencies) * 1000 if latencies else 0,
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        "errors": errors,
+    }
+
+def _wait_until_ready(port: int) -> None:
+    import httpx
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError("benchmark server did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description="同步与异步数据库读取路径的吞吐量对比")
+    parser.add_argument("--concurrency", type=int, default=200, help="并发客户端数")
+    parser.add_argument("--seconds", type=float, default=10, help="每个路径的测试时长")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    import datetime
+    from core.database import engine, SessionLocal
+    from models import Base, Message
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    now = datetime.datetime.now()
+    db.add_all(
+        Message(nickname=f"n{i}", content="留言内容" * 20, ip_address="0", status="approved",
+                approved_at=now - datetime.timedelta(seconds=i))
+        for i in range(1000)
+    )
+    db.commit()
+    db.close()
+    engine.dispose()
+
+    server = multiprocessing.get_context("spawn").Process(target=_serve, args=(args.port,), daemon=True)
+    server.start()
+    _wait_until_ready(args.port)
+    try:
+        for name in ("sync", "async"):
+            url = f"http://127.0.0.1:{args.port}/{name}"
+            asyncio.run(_load(url, 10, 1))  # warm-up
+            result = asyncio.run(_load(url, args.concurrency, args.seconds))
+            print(f"{name:>5}: {result['rps']:.0f} req/s, p50 {result['p50']:.1f} ms, "
+                  f"p95 {result['p95']:.1f} ms, errors {result['errors']}")
+    finally:
+        server.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Banned-word check micro-benchmark against a scratch SQLite database.
+
+Compares the per-message cost of the old check (load every banned word, one substring
+test per word against content and nickname) with the cached Aho-Corasick matcher used
+by calculate_spam_score:
+
+    python -m benchmarks.banned_words --words 10000 --messages 300
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz的一是不了人我在有他这中大来上国个到说们为子和你地出道也时年"
+
+def _legacy_matches(db, content: str, nickname: str):
+    # 旧实现：每条留言都读取整张词表并逐词做子串检查
+    from models import BannedWord
+    content_lower = content.lower()
+    nickname_lower = nickname.lower()
+    return [
+        banned_word.severity for banned_word in db.query(BannedWord).all()
+        if banned_word.word.lower() in content_lower or banned_word.word.lower() in nickname_lower
+    ]
+
+def _text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+def _timed(label: str, count: int, run) -> float:
+    started = time.perf_counter()
+    found = sum(len(run(i)) for i in range(count))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<24} {elapsed * 1000 / count:8.3f} ms/message  ({found} matches)")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="屏蔽词检查性能测试（旧的逐词检查 vs Aho-Corasick 自动机）")
+    parser.add_argument("--words", type=int, default=10000, help="屏蔽词数量")
+    parser.add_argument("--messages", type=int, default=300, help="检查的留言条数")
+    parser.add_argument("--length", type=int, default=200, help="每条留言的字符数")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "banned_words.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from core.banned_words import AhoCorasick, banned_word_matcher
+    from core.database import engine, SessionLocal
+    from core.table_versions import install_version_triggers
+    from models import Base, BannedWord
+    Base.metadata.create_all(bind=engine)
+    install_version_triggers(engine)
+
+    rng = random.Random(42)
+    words = list({_text(rng, rng.randint(3, 6)) for _ in range(args.words)})
+    db = SessionLocal()
+    db.add_all(BannedWord(word=word, severity=rng.choice(["low", "medium", "high"])) for word in words)
+    db.commit()
+    messages = [(_text(rng, args.length), _text(rng, 8)) for _ in range(args.messages)]
+
+    started = time.perf_counter()
+    AhoCorasick(words)
+    print(f"{len(words)} banned words, automaton built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    banned_word_matcher.matches(db, "")  # 预热：首次调用构建自动机
+    legacy = _timed("legacy (query + scan)", args.messages, lambda i: _legacy_matches(db, *messages[i]))
+    cached = _timed("automaton (cached)", args.messages, lambda i: banned_word_matcher.matches(db, *messages[i]))
+    print(f"speedup: {legacy / cached:.1f}x")
+
+    for i in range(min(args.messages, 200)):
+        assert sorted(_legacy_matches(db, *messages[i])) == sorted(banned_word_matcher.matches(db, *messages[i]))
+    db.close()
+
+if __name__ == "__main__":
+    main()
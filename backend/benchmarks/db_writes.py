@@ -0,0 +1,133 @@
+"""
+Concurrent write stress test against a scratch SQLite database.
+
+Simulates several gunicorn workers (processes) with many request threads each, all
+liking messages at once, and reports throughput and the share of requests that failed
+with "database is locked". Compare:
+
+    python -m benchmarks.db_writes --mode legacy   # rollback journal, one commit per request thread
+    python -m benchmarks.db_writes --mode writer   # WAL + pragmas + per-process writer queue
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+LEGACY_ENV = {"SQLITE_JOURNAL_MODE": "delete", "SQLITE_SYNCHRONOUS": "full", "DB_WRITE_RETRIES": "0"}
+
+def _like(session, message_id: int, ip: str) -> None:
+    # 与 like_message 相同的读-改-写模式
+    from models import Message, MessageLike
+    message = session.query(Message).filter(Message.id == message_id).first()
+    session.add(MessageLike(message_id=message_id, ip_address=ip))
+    message.likes_count += 1
+    session.commit()
+
+def _reader(stop: threading.Event, counts: dict) -> None:
+    from core.database import SessionLocal
+    from models import Message
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            db.query(Message).filter(Message.status == "approved").order_by(Message.id.desc()).limit(20).all()
+            counts["reads"] += 1
+        except Exception:
+            counts["read_errors"] += 1
+        finally:
+            db.close()
+        time.sleep(0.005)
+
+def _worker(mode: str, worker_id: int, threads: int, requests: int, messages: int, results) -> None:
+    from sqlalchemy.exc import OperationalError
+    from core.database import SessionLocal
+    from core.db_writer import db_writer
+
+    counts = {"ok": 0, "locked": 0, "reads": 0, "read_errors": 0}
+    lock = threading.Lock()
+
+    def request_thread(thread_id: int) -> None:
+        for i in range(requests):
+            ip = f"10.{worker_id}.{thread_id}.{i}"
+            message_id = i % messages + 1
+            try:
+                if mode == "writer":
+                    db_writer.run(lambda session: _like(session, message_id, ip))
+                else:
+                    db = SessionLocal()
+                    try:
+                        _like(db, message_id, ip)
+                    finally:
+                        db.close()
+                outcome = "ok"
+            except OperationalError:
+                outcome = "locked"
+            with lock:
+                counts[outcome] += 1
+
+    stop = threading.Event()
+    reader = threading.Thread(target=_reader, args=(stop, counts))
+    reader.start()
+    pool = [threading.Thread(target=request_thread, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    stop.set()
+    reader.join()
+    results.put(counts)
+
+def main():
+    parser = argparse.ArgumentParser(description="并发写入压力测试（模拟多个 gunicorn worker 同时点赞）")
+    parser.add_argument("--mode", choices=["legacy", "writer"], default="writer")
+    parser.add_argument("--processes", type=int, default=4, help="模拟的 worker 进程数")
+    parser.add_argument("--threads", type=int, default=16, help="每个进程的请求线程数")
+    parser.add_argument("--requests", type=int, default=25, help="每个线程的请求数")
+    parser.add_argument("--messages", type=int, default=20, help="被点赞的留言数")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "stress.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    if args.mode == "legacy":
+        os.environ.update(LEGACY_ENV)
+
+    from core.database import engine, SessionLocal
+    from models import Base, Message
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(Message(nickname="n", content="c", ip_address="0", status="approved", likes_count=0)
+               for _ in range(args.messages))
+    db.commit()
+    db.close()
+    engine.dispose()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    started = time.perf_counter()
+    processes = [
+        context.Process(target=_worker, args=(args.mode, p, args.threads, args.requests, args.messages, results))
+        for p in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    totals = {"ok": 0, "locked": 0, "reads": 0, "read_errors": 0}
+    for _ in processes:
+        for key, value in results.get().items():
+            totals[key] += value
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    stored = sum(message.likes_count for message in db.query(Message).all())
+    db.close()
+
+    attempted = totals["ok"] + totals["locked"]
+    print(f"mode={args.mode} writes={attempted} in {elapsed:.2f}s ({totals['ok'] / elapsed:.0f} ok/s)")
+    print(f"locked errors: {totals['locked']} ({100.0 * totals['locked'] / attempted:.2f}%)")
+    print(f"reads during the run: {totals['reads']} (errors: {totals['read_errors']})")
+    print(f"likes_count total: {stored} (successful likes: {totals['ok']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Concurrent like/unlike test against a scratch SQLite database.
+
+Several processes (standing in for gunicorn workers) with many threads each send likes
+through the batched like buffer at once: every IP likes every message, some likes are sent
+twice and some are taken back. Afterwards each likes_count must equal both the number of
+successful likes minus unlikes and the number of message_likes rows:
+
+    python -m benchmarks.likes --processes 4 --threads 50 --ips 25 --messages 10
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+def _worker(worker_id: int, threads: int, ips: int, messages: int, results) -> None:
+    from fastapi import HTTPException
+    from core.like_buffer import like_buffer
+
+    counts = {"liked": 0, "unliked": 0, "duplicates": 0, "errors": 0}
+    net = [0] * (messages + 1)
+    lock = threading.Lock()
+
+    def request_thread(thread_id: int) -> None:
+        for ip_number in range(ips):
+            ip = f"10.{worker_id}.{thread_id}.{ip_number}"
+            for message_id in range(1, messages + 1):
+                # 每个 IP 点赞所有留言；部分重复点赞，部分再取消
+                actions = [True]
+                if ip_number % 5 == 0:
+                    actions.append(True)
+                if ip_number % 3 == 0:
+                    actions.append(False)
+                for liked in actions:
+                    try:
+                        like_buffer.submit(message_id, ip, liked).result()
+                        outcome = "liked" if liked else "unliked"
+                    except HTTPException as e:
+                        outcome = "duplicates" if e.status_code == 400 else "errors"
+                    except Exception:
+                        outcome = "errors"
+                    with lock:
+                        counts[outcome] += 1
+                        if outcome in ("liked", "unliked"):
+                            net[message_id] += 1 if liked else -1
+
+    pool = [threading.Thread(target=request_thread, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((counts, net))
+
+def main():
+    parser = argparse.ArgumentParser(description="并发点赞正确性测试（多进程 + 攒批写入）")
+    parser.add_argument("--processes", type=int, default=4, help="模拟的 worker 进程数")
+    parser.add_argument("--threads", type=int, default=50, help="每个进程的请求线程数")
+    parser.add_argument("--ips", type=int, default=25, help="每个线程模拟的 IP 数")
+    parser.add_argument("--messages", type=int, default=10, help="被点赞的留言数")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "likes.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from sqlalchemy import func
+    from core.database import engine, SessionLocal
+    from models import Base, Message, MessageLike
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(Message(nickname="n", content="c", ip_address="0", status="approved", likes_count=0)
+               for _ in range(args.messages))
+    db.commit()
+    db.close()
+    engine.dispose()
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    started = time.perf_counter()
+    processes = [
+        context.Process(target=_worker, args=(p, args.threads, args.ips, args.messages, results))
+        for p in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    totals = {"liked": 0, "unliked": 0, "duplicates": 0, "errors": 0}
+    expected = [0] * (args.messages + 1)
+    for _ in processes:
+        counts, net = results.get()
+        for key, value in counts.items():
+            totals[key] += value
+        expected = [a + b for a, b in zip(expected, net)]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    stored = dict(db.query(Message.id, Message.likes_count).all())
+    rows = dict(db.query(MessageLike.message_id, func.count()).group_by(MessageLike.message_id).all())
+    db.close()
+
+    requests = sum(totals.values())
+    print(f"{requests} requests in {elapsed:.2f}s ({requests / elapsed:.0f}/s): {totals}")
+    mismatches = [
+        (message_id, stored[message_id], rows.get(message_id, 0), expected[message_id])
+        for message_id in stored
+        if not stored[message_id] == rows.get(message_id, 0) == expected[message_id]
+    ]
+    for message_id, count, row_count, want in mismatches:
+        print(f"message {message_id}: likes_count={count} rows={row_count} expected={want}")
+    print("OK: no lost or duplicated likes" if not mismatches and not totals["errors"] else "FAILED")
+
+if __name__ == "__main__":
+    main()
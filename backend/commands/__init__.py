@@ -0,0 +1,2 @@
+# Batch/maintenance commands. Run from the backend directory, e.g.:
+#   python -m commands.thumbnails
@@ -0,0 +1,22 @@
+import argparse
+from core.database import engine
+from core.photo_import import PHOTO_IMPORT_DIRS, import_photos
+from models import Base
+from schemas import CategoryEnum
+
+def main():
+    parser = argparse.ArgumentParser(description="把媒体目录中的图片增量同步到 photos 表（新增、更新、删除）")
+    parser.add_argument("--dirs", nargs="+", default=list(PHOTO_IMPORT_DIRS), help="media_root 下的子目录")
+    parser.add_argument("--category", default=CategoryEnum.life.value,
+                        choices=[category.value for category in CategoryEnum], help="新导入照片的分类")
+    parser.add_argument("--no-prune", action="store_true", help="不删除文件已不存在的照片记录")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    report = import_photos(args.dirs, category=args.category, prune=not args.no_prune)
+    for subdir, counts in report.items():
+        print(f"{subdir}: " + ", ".join(f"{key}={value}" for key, value in counts.items()))
+
+if __name__ == "__main__":
+    main()
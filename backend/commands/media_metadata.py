@@ -0,0 +1,19 @@
+import argparse
+from core.database import engine
+from core.media_metadata import METADATA_SOURCE_DIRS, sync_media_metadata
+from models import Base
+
+def main():
+    parser = argparse.ArgumentParser(description="提取媒体目录图片的尺寸、EXIF 拍摄时间、主色和占位图")
+    parser.add_argument("--dirs", nargs="+", default=list(METADATA_SOURCE_DIRS), help="media_root 下的子目录")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认等于 CPU 核数")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    report = sync_media_metadata(args.dirs, workers=args.workers)
+    for subdir, counts in report.items():
+        print(f"{subdir}: " + ", ".join(f"{key}={value}" for key, value in counts.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import argparse
+import sys
+from core.database import engine
+from core.migrations import check_query_plans, current_version, run_migrations
+from models import Base
+
+def main():
+    parser = argparse.ArgumentParser(description="升级数据库结构（应用未执行的迁移），并可检查热点查询是否走索引")
+    parser.add_argument("--target", type=int, default=None, help="只升级到指定版本")
+    parser.add_argument("--check", action="store_true", help="检查热点查询的执行计划，有全表扫描时返回非 0")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    applied = run_migrations(engine, target=args.target)
+    with engine.connect() as conn:
+        version = current_version(conn)
+    print(f"applied: {', '.join(map(str, applied)) or 'none'}; schema version {version}")
+
+    if args.check:
+        failures = check_query_plans(engine)
+        for name, detail in failures.items():
+            print(f"FULL SCAN {name}: {detail}")
+        if failures:
+            sys.exit(1)
+        print("all hot queries use an index")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import argparse
+from core.counters import install_counters, reconcile_counters
+from core.database import engine, writer_engine
+from models import Base
+
+def main():
+    parser = argparse.ArgumentParser(description="按数据表重新统计 stat_counters，修正计数偏差")
+    parser.add_argument("--dry-run", action="store_true", help="只报告偏差，不写入")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    install_counters(engine)
+
+    # BEGIN IMMEDIATE：先拿写锁，统计期间其他进程的写入只能等待
+    with writer_engine.connect() as conn:
+        drift = reconcile_counters(conn)
+        for (scope, key), (stored, actual) in sorted(drift.items()):
+            print(f"{scope} {key!r}: {stored} -> {actual}")
+        if not args.dry_run:
+            conn.commit()
+    print(f"{len(drift)} counters drifted{' (not fixed, dry run)' if args.dry_run and drift else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import argparse
+from core.thumbnails import THUMBNAIL_SOURCE_DIRS, build_thumbnails
+
+def main():
+    parser = argparse.ArgumentParser(description="为媒体目录生成响应式缩略图（WebP/JPEG，多种宽度）")
+    parser.add_argument("--dirs", nargs="+", default=list(THUMBNAIL_SOURCE_DIRS), help="media_root 下的子目录")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认等于 CPU 核数")
+    parser.add_argument("--force", action="store_true", help="忽略 mtime，全部重新生成")
+    parser.add_argument("--no-prune", action="store_true", help="不删除源文件已不存在的缩略图")
+    args = parser.parse_args()
+
+    report = build_thumbnails(args.dirs, workers=args.workers, force=args.force, prune=not args.no_prune)
+    for subdir, counts in report.items():
+        print(f"{subdir}: " + ", ".join(f"{key}={value}" for key, value in counts.items()))
+
+if __name__ == "__main__":
+    main()
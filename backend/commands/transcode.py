@@ -0,0 +1,33 @@
+import argparse
+import time
+from core.database import engine, SessionLocal
+from core.transcode import queue_missing_transcodes, run_pending_transcodes
+from models import Base
+
+def main():
+    parser = argparse.ArgumentParser(description="把本地视频转码为自适应码率 HLS（多码率 + master.m3u8）")
+    parser.add_argument("--all", action="store_true", help="同时为所有尚未转码或源文件已变化的视频排队")
+    parser.add_argument("--force", action="store_true", help="配合 --all：全部重新转码")
+    parser.add_argument("--workers", type=int, default=None, help="同时运行的 ffmpeg 进程数，默认 TRANSCODE_WORKERS")
+    parser.add_argument("--watch", type=int, default=0, metavar="SECONDS", help="常驻运行，每隔 N 秒处理新的排队任务")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    if args.all:
+        db = SessionLocal()
+        try:
+            print(f"queued: {queue_missing_transcodes(db, force=args.force)}")
+        finally:
+            db.close()
+
+    while True:
+        counts = run_pending_transcodes(args.workers)
+        if any(counts.values()) or not args.watch:
+            print(", ".join(f"{key}={value}" for key, value in counts.items()))
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import argparse
+from core.database import engine
+from core.video_previews import generate_video_previews
+from models import Base
+
+def main():
+    parser = argparse.ArgumentParser(description="批量提取本地视频的封面和拖动预览图（sprite + WebVTT），并写回 Video.thumbnail")
+    parser.add_argument("--ids", nargs="+", type=int, default=None, help="只处理指定的视频 ID")
+    parser.add_argument("--workers", type=int, default=None, help="同时运行的 ffmpeg 进程数，默认 PREVIEW_WORKERS")
+    parser.add_argument("--force", action="store_true", help="忽略已有结果，全部重新提取")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    counts = generate_video_previews(args.ids, workers=args.workers, force=args.force)
+    print(", ".join(f"{key}={value}" for key, value in counts.items()))
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
-from .database import settings, get_db, engine, SessionLocal
+from .database import settings, get_db, get_async_db, engine, SessionLocal, AsyncSessionLocal
+from .media_index import get_media_index, rescan_media_indexes
 
-__all__ = ["settings", "get_db", "engine", "SessionLocal"]
\ No newline at end of file
+__all__ = ["settings", "get_db", "get_async_db", "engine", "SessionLocal", "AsyncSessionLocal", "get_media_index", "rescan_media_indexes"]
\ No newline at end of file
@@ -0,0 +1,96 @@
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import BannedWord, TableVersion
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher: finds every pattern occurring in a text in one pass
+    over the text, whatever the number of patterns (Aho-Corasick automaton).
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[int]] = [set()]
+        for index, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(index)
+
+        # 按层（BFS）计算失败链接，并把失败状态的输出并入当前状态
+        self._fail = [0] * len(self._goto)
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self._goto[state].items():
+                pending.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                outputs[next_state] |= outputs[self._fail[next_state]]
+        self._outputs: List[Tuple[int, ...]] = [tuple(output) for output in outputs]
+
+    def find(self, text: str) -> Set[int]:
+        """Indexes (in the order given to __init__) of the patterns occurring in text"""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+class BannedWordMatcher:
+    """
+    Per-process matcher over the banned_words table, rebuilt once per table generation.
+
+    The generation is the banned_words row of table_versions, bumped by a trigger whenever
+    a word is added or removed in any worker, so checking it costs one primary-key read
+    instead of loading the whole list on every message.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (generation, automaton, severity of each pattern), replaced as a whole on rebuild
+        self._compiled: Tuple[Optional[int], AhoCorasick, List[str]] = (None, AhoCorasick(()), [])
+
+    def _current(self, db: Session) -> Tuple[Optional[int], AhoCorasick, List[str]]:
+        version = db.scalar(select(TableVersion.version).where(TableVersion.name == "banned_words"))
+        compiled = self._compiled
+        if version is None or version != compiled[0]:
+            with self._lock:
+                compiled = self._compiled
+                if version is None or version != compiled[0]:
+                    words = db.execute(select(BannedWord.word, BannedWord.severity)).all()
+                    compiled = (
+                        version,
+                        AhoCorasick(word.lower() for word, _ in words),
+                        [severity for _, severity in words],
+                    )
+                    self._compiled = compiled
+        return compiled
+
+    def matches(self, db: Session, *texts: str) -> List[str]:
+        """Severities of the banned words found (case-insensitively) in any of the texts, one per word"""
+        _, automaton, severities = self._current(db)
+        found: Set[int] = set()
+        for text in texts:
+            found |= automaton.find(text.lower())
+        return [severities[index] for index in found]
+
+banned_word_matcher = BannedWordMatcher()
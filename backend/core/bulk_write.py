@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Type
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from schemas import BulkItemResult, BulkWriteResponse
+from .database import settings
+from .db_writer import WRITE_CHUNK_SIZE, db_writer, is_lock_error
+from .media_serving import media_relative_path
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# (id, written row, True if inserted / False if updated)
+WrittenRow = Tuple[int, Dict[str, Any], bool]
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+async def read_items(request: Request) -> AsyncIterator[Any]:
+    """
+    Items of a JSON array body, or of an NDJSON body (one object per line) read as it
+    streams in. A malformed NDJSON line yields its ValueError instead of an item.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        buffer = b""
+        async for data in request.stream():
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _parse_line(line)
+        if buffer.strip():
+            yield _parse_line(buffer)
+        return
+
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    for item in items:
+        yield item
+
+def _validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'item'}: {e['msg']}" for e in error.errors())
+
+def _upsert_key(value: Optional[str]) -> Optional[str]:
+    # "/media/x.jpg" 与 "x.jpg" 视为同一个文件
+    return media_relative_path(value) if value else None
+
+def _write_rows(session: Session, model, rows: List[Dict[str, Any]], upsert_on: Optional[str]) -> List[WrittenRow]:
+    """Insert rows (or update the existing row with the same upsert_on value) with executemany statements"""
+    existing: Dict[str, int] = {}
+    if upsert_on:
+        keys = {_upsert_key(row.get(upsert_on)) for row in rows} - {None}
+        if keys:
+            column = getattr(model, upsert_on)
+            forms = list(keys) + [f"{settings.media_url}{key}" for key in keys]
+            for row_id, value in session.execute(select(model.id, column).where(column.in_(forms))):
+                # 同一文件有多行时固定更新最早的一行
+                key = _upsert_key(value)
+                existing[key] = min(existing.get(key, row_id), row_id)
+
+    inserts = [row for row in rows if _upsert_key(row.get(upsert_on)) not in existing] if upsert_on else rows
+    updates = [row for row in rows if upsert_on and _upsert_key(row.get(upsert_on)) in existing]
+
+    ids = []
+    if inserts:
+        ids = session.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True), inserts
+        ).scalars().all()
+    if updates:
+        session.execute(update(model), [
+            {**row, "id": existing[_upsert_key(row[upsert_on])]} for row in updates
+        ])
+
+    inserted = iter(zip(ids, inserts))
+    written = []
+    for row in rows:
+        key = _upsert_key(row.get(upsert_on)) if upsert_on else None
+        if key in existing:
+            written.append((existing[key], row, False))
+        else:
+            written.append((*next(inserted), True))
+    return written
+
+async def bulk_write(
+    request: Request,
+    schema: Type[BaseModel],
+    model,
+    upsert_on: Optional[str] = None,
+    before_commit: Optional[Callable[[Session, List[WrittenRow]], None]] = None,
+    after_commit: Optional[Callable[[List[WrittenRow]], None]] = None
+) -> BulkWriteResponse:
+    """
+    Validate the items of a bulk request against schema and write them in chunks of
+    WRITE_CHUNK_SIZE rows, one transaction per chunk on the writer thread.
+
+    With upsert_on (e.g. "file_path") an item whose value matches an existing row updates
+    that row; within one chunk only the last of several items with the same value is
+    written, the others are reported as superseded. Invalid
+    items are reported and skipped. If a chunk fails as a whole, its rows are retried one
+    by one (each in a savepoint) so only the offending items are reported as errors.
+    """
+    results: List[BulkItemResult] = []
+    pending: List[Tuple[int, Dict[str, Any]]] = []
+
+    def write_chunk(rows: List[Tuple[int, Dict[str, Any]]]) -> Callable[[Session], List[Any]]:
+        def write(session: Session) -> List[Any]:
+            try:
+                written = _write_rows(session, model, [row for _, row in rows], upsert_on)
+                outcome: List[Any] = list(written)
+            except Exception as e:
+                # 锁冲突交给 db_writer 整体重试
+                if isinstance(e, OperationalError) and is_lock_error(e):
+                    raise
+                session.rollback()
+                logger.info("Bulk chunk of %s failed (%s), retrying row by row", model.__tablename__, e)
+                written, outcome = [], []
+                for _, row in rows:
+                    try:
+                        with session.begin_nested():
+                            row_written = _write_rows(session, model, [row], upsert_on)
+                        written.extend(row_written)
+                        outcome.append(row_written[0])
+                    except Exception as row_error:
+                        outcome.append(row_error)
+            if before_commit and written:
+                before_commit(session, written)
+            session.commit()
+            return outcome
+
+        return write
+
+    async def flush() -> None:
+        if not pending:
+            return
+        chunk = list(pending)
+        pending.clear()
+        rows = _dedupe(chunk, upsert_on)
+        outcome = await asyncio.wrap_future(db_writer.submit(write_chunk(rows)))
+        by_key = {}
+        for (index, row), result in zip(rows, outcome):
+            if isinstance(result, Exception):
+                item = BulkItemResult(index=index, status="error", error=str(result).splitlines()[0])
+            else:
+                item = BulkItemResult(index=index, status="created" if result[2] else "updated", id=result[0])
+            by_key[_chunk_key(row, upsert_on, index)] = item
+        # 同一块内被后面条目覆盖的重复条目没有写入，单独标记且不计入总数
+        for index, row in chunk:
+            item = by_key[_chunk_key(row, upsert_on, index)]
+            if item.index == index:
+                results.append(item)
+            else:
+                results.append(BulkItemResult(index=index, status="superseded", superseded_by=item.index))
+        if after_commit:
+            written = [result for result in outcome if not isinstance(result, Exception)]
+            if written:
+                after_commit(written)
+
+    index = 0
+    async for item in read_items(request):
+        if isinstance(item, ValueError):
+            results.append(BulkItemResult(index=index, status="error", error=f"Invalid JSON: {item}"))
+        else:
+            try:
+                pending.append((index, schema.model_validate(item).model_dump()))
+            except ValidationError as e:
+                results.append(BulkItemResult(index=index, status="error", error=_validation_error(e)))
+        index += 1
+        if len(pending) >= WRITE_CHUNK_SIZE:
+            await flush()
+    await flush()
+
+    results.sort(key=lambda result: result.index)
+    return BulkWriteResponse(
+        created=sum(1 for result in results if result.status == "created"),
+        updated=sum(1 for result in results if result.status == "updated"),
+        failed=sum(1 for result in results if result.status == "error"),
+        items=results
+    )
+
+def _chunk_key(row: Dict[str, Any], upsert_on: Optional[str], index: int):
+    key = _upsert_key(row.get(upsert_on)) if upsert_on else None
+    return key if key is not None else ("index", index)
+
+def _dedupe(chunk: List[Tuple[int, Dict[str, Any]]], upsert_on: Optional[str]) -> List[Tuple[int, Dict[str, Any]]]:
+    """Keep the last item per upsert key (items without a key are all kept), in request order"""
+    last = {_chunk_key(row, upsert_on, index): (index, row) for index, row in chunk}
+    return sorted(last.values(), key=lambda item: item[0])
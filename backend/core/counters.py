@@ -0,0 +1,128 @@
+from typing import Dict, Iterable, Tuple
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import StatCounter
+
+# table -> {dimension: SQL expression over a row alias}; every table also gets a total.
+# Rows whose dimension is NULL are counted in the total only (like COUNT(DISTINCT ...)).
+COUNTED_TABLES: Dict[str, Dict[str, str]] = {
+    "photos": {"category": "{row}.category"},
+    "videos": {"category": "{row}.category"},
+    "timeline_events": {
+        "year": "strftime('%Y', {row}.event_date)",
+        "featured": "{row}.is_featured",
+    },
+    "messages": {"status": "{row}.status"},
+}
+
+# Columns whose updates move a row between keys
+_DIMENSION_COLUMNS = {
+    "photos": ("category",),
+    "videos": ("category",),
+    "timeline_events": ("event_date", "is_featured"),
+    "messages": ("status",),
+}
+
+def _scopes(table: str) -> Iterable[Tuple[str, str]]:
+    """(scope, key expression with {row}) for the total and every dimension of a table"""
+    yield table, "''"
+    for dimension, expression in COUNTED_TABLES[table].items():
+        yield f"{table}.{dimension}", f"CAST({expression} AS TEXT)"
+
+def _increment(scope: str, key: str) -> str:
+    # SELECT ... WHERE 跳过 NULL 维度值；WHERE 子句也消除了 UPSERT 的语法歧义
+    return (
+        f"INSERT INTO stat_counters (scope, key, count) SELECT '{scope}', {key}, 1 WHERE {key} IS NOT NULL "
+        f"ON CONFLICT (scope, key) DO UPDATE SET count = count + 1;"
+    )
+
+def _decrement(scope: str, key: str) -> str:
+    return f"UPDATE stat_counters SET count = count - 1 WHERE scope = '{scope}' AND key = {key};"
+
+def install_counters(engine: Engine) -> None:
+    """
+    Create the triggers maintaining stat_counters for every table in COUNTED_TABLES.
+
+    Triggers run inside the writing transaction, so the counters stay exact for ORM writes,
+    bulk imports and set-based statements alike. The counters are filled from the tables
+    when the triggers are first created.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        installed = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'messages_counters_insert'")
+        ).first() is not None
+        for table in COUNTED_TABLES:
+            scopes = list(_scopes(table))
+            increments = [_increment(scope, key.format(row="new")) for scope, key in scopes]
+            decrements = [_decrement(scope, key.format(row="old")) for scope, key in scopes]
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_counters_insert AFTER INSERT ON {table} "
+                f"BEGIN {' '.join(increments)} END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_counters_delete AFTER DELETE ON {table} "
+                f"BEGIN {' '.join(decrements)} END"
+            ))
+            # 只有维度列变化时才在键之间移动计数（总数不变）
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_counters_update "
+                f"AFTER UPDATE OF {', '.join(_DIMENSION_COLUMNS[table])} ON {table} "
+                f"BEGIN {' '.join(decrements[1:])} {' '.join(increments[1:])} END"
+            ))
+        if not installed:
+            reconcile_counters(conn)
+
+def reconcile_counters(conn: Connection) -> Dict[Tuple[str, str], Tuple[int, int]]:
+    """
+    Recount every counter from its table and fix the stored values.
+
+    Returns {(scope, key): (stored, actual)} for the counters that had drifted. Run it in a
+    transaction holding the write lock (e.g. on writer_engine) so no write slips in between.
+    """
+    actual: Dict[Tuple[str, str], int] = {}
+    for table in COUNTED_TABLES:
+        for scope, key in _scopes(table):
+            key = key.format(row=table)
+            for value, count in conn.execute(text(
+                f"SELECT {key}, COUNT(*) FROM {table} WHERE {key} IS NOT NULL GROUP BY 1"
+            )):
+                actual[(scope, value)] = count
+        actual.setdefault((table, ""), 0)
+
+    stored = {
+        (scope, key): count
+        for scope, key, count in conn.execute(text("SELECT scope, key, count FROM stat_counters"))
+    }
+    drift = {
+        name: (stored.get(name, 0), actual.get(name, 0))
+        for name in set(stored) | set(actual)
+        if stored.get(name, 0) != actual.get(name, 0)
+    }
+
+    conn.execute(text("DELETE FROM stat_counters"))
+    if actual:
+        conn.execute(
+            text("INSERT INTO stat_counters (scope, key, count) VALUES (:scope, :key, :count)"),
+            [{"scope": scope, "key": key, "count": count} for (scope, key), count in actual.items()]
+        )
+    return drift
+
+async def get_counters(db: AsyncSession, tables: Iterable[str]) -> Dict[str, Dict[str, int]]:
+    """
+    {scope: {key: count}} for the given tables in one indexed read, e.g.
+    {"messages": {"": 12}, "messages.status": {"approved": 9, "pending": 3}}.
+    Keys whose count dropped to zero are left out.
+    """
+    scopes = [scope for table in tables for scope, _ in _scopes(table)]
+    counters: Dict[str, Dict[str, int]] = {scope: {} for scope in scopes}
+    rows = await db.execute(
+        select(StatCounter.scope, StatCounter.key, StatCounter.count)
+        .where(StatCounter.scope.in_(scopes), StatCounter.count > 0)
+    )
+    for scope, key, count in rows:
+        counters[scope][key] = count
+    return counters
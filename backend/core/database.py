@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 from fastapi import HTTPException, Header
 import os
 
@@ -11,6 +13,41 @@ class Settings(BaseSettings):
     media_root: str = os.path.abspath("../media")
     media_url: str = "/media/"
     admin_api_key: str = "your-secure-admin-key-change-this"  # 管理员API密钥
+    thumbnail_dir: str = "thumbs"  # 缩略图缓存目录（相对 media_root）
+    thumbnail_widths: List[int] = [320, 640, 1280]
+    thumbnail_formats: List[str] = ["webp", "jpg"]
+    media_serving: str = "static"  # static: Python 直接返回文件；accel: 通过 X-Accel-Redirect 交给 nginx
+    media_accel_location: str = "/_protected_media/"  # nginx internal location
+    ffmpeg_binary: str = "ffmpeg"
+    ffprobe_binary: str = "ffprobe"
+    hls_dir: str = "hls"  # HLS 输出目录（相对 media_root）
+    hls_segment_seconds: int = 6
+    transcode_workers: int = 1  # 同时运行的 ffmpeg 进程数
+    transcode_threads: int = 2  # 每个 ffmpeg 进程的编码线程数
+    transcode_stale_after: int = 7200  # processing 状态超过该秒数视为转码进程已退出，重新排队
+    video_thumbnail_dir: str = "video_thumbnails"  # 视频封面和预览图（相对 media_root）
+    preview_workers: int = 2  # 批量提取封面时同时运行的 ffmpeg 进程数
+    metadata_sync_lock: str = os.path.abspath("./.metadata-sync.lock")  # 跨 worker 的元数据同步文件锁（不能放在公开的 media_root 下）
+    hero_weights: Dict[str, int] = {}  # 首页随机图权重：文件名通配符 -> 每轮出现次数（0 为不出现）
+    sqlite_journal_mode: str = "wal"  # wal: 读写互不阻塞；delete: SQLite 默认模式
+    sqlite_synchronous: str = "normal"  # WAL 下 normal 只在检查点时 fsync，断电不会损坏数据库
+    sqlite_busy_timeout_ms: int = 5000  # 等待其他进程写锁的时间
+    sqlite_mmap_size: int = 268435456  # 256 MB 内存映射读取
+    sqlite_cache_size_kb: int = 16384  # 每个连接的页缓存
+    db_write_retries: int = 5  # 写入遇到 "database is locked" 时的重试次数
+    like_flush_interval_ms: int = 200  # 点赞/取消点赞攒批写入的最长等待时间
+    like_batch_size: int = 500  # 每批最多写入的点赞事件数
+    async_database_url: Optional[str] = None  # 异步驱动的连接串，默认由 database_url 推导（sqlite -> sqlite+aiosqlite）
+    async_pool_size: int = 20  # 异步连接池大小（aiosqlite 每个连接一个线程）
+    response_cache_size: int = 256  # 每个 worker 缓存的响应条数（LRU）
+    response_cache_ttl: float = 300  # 缓存响应的最长有效期（秒），数据变化时立即失效
+    message_rate_limit: int = 3  # 每个 IP 在时间窗口内最多提交的留言数
+    message_rate_window: int = 600  # 留言限流窗口（秒）
+    like_rate_limit: int = 30  # 每个 IP 在时间窗口内最多的点赞/取消点赞次数
+    like_rate_window: int = 60  # 点赞限流窗口（秒）
+    rate_limit_slots: int = 8192  # 共享内存中限流计数表的槽位数
+    event_stream_poll_ms: int = 250  # 每个 worker 检查新推送事件的间隔
+    event_stream_heartbeat: int = 15  # SSE 心跳间隔（秒），防止代理断开空闲连接
     
     class Config:
         env_file = ".env"
@@ -23,8 +60,45 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
 )
 
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning; journal_mode=WAL is persistent, the rest is per connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine used only by the per-process writer thread (core/db_writer.py). Its transactions start
+# with BEGIN IMMEDIATE, so the write lock is taken up front and waits in busy_timeout instead
+# of failing when a read transaction later tries to upgrade to a write.
+writer_engine = create_engine(
+    settings.database_url,
+    pool_size=1,
+    max_overflow=0,
+    connect_args={"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
+)
+
+if writer_engine.dialect.name == "sqlite":
+    @event.listens_for(writer_engine, "connect")
+    def _writer_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, connection_record)
+        # 由 begin 事件发出 BEGIN，pysqlite 不再自行延迟开始事务
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(writer_engine, "begin")
+    def _writer_begin(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+WriterSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=writer_engine)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -33,6 +107,29 @@ def get_db():
     finally:
         db.close()
 
+# Async engine for the read-heavy endpoints (async def), so they do not occupy threadpool slots
+def _async_database_url(url: str) -> str:
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+# aiosqlite defaults to NullPool (a new connection and thread per session); keep a fixed pool instead
+async_engine = create_async_engine(
+    settings.async_database_url or _async_database_url(settings.database_url),
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.async_pool_size,
+    max_overflow=0
+)
+
+if async_engine.dialect.name == "sqlite":
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Admin authentication dependency
 def verify_admin_key(x_api_key: str = Header(...)):
     """Verify admin API key from header"""
@@ -0,0 +1,92 @@
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Iterator, List, Optional
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from .database import settings, WriterSessionLocal
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 0.01  # seconds, doubled per attempt, with jitter
+RETRY_MAX_DELAY = 0.5
+
+# Rows per executemany statement / transaction for bulk writes (imports, metadata sync, bulk endpoints)
+WRITE_CHUNK_SIZE = 500
+
+def chunks(items: List[Any], size: int = WRITE_CHUNK_SIZE) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def is_lock_error(error: OperationalError) -> bool:
+    message = str(error.orig).lower()
+    return "database is locked" in message or "database is busy" in message
+
+class DatabaseWriter:
+    """
+    Per-process write queue: one thread executes write jobs one after another.
+
+    Writes from the request threads of one worker therefore never contend with each other,
+    and with WAL they never block readers either. Contention between gunicorn workers is
+    left to busy_timeout; a job that still hits "database is locked" is rolled back and
+    retried with exponential backoff. The thread is started lazily, i.e. after the fork.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job, future = self._queue.get()
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self._execute(job))
+                except BaseException as e:
+                    future.set_exception(e)
+            self._queue.task_done()
+
+    def _execute(self, job: Callable[[Session], Any]) -> Any:
+        attempt = 0
+        while True:
+            db = WriterSessionLocal()
+            try:
+                # job 负责 commit；异常（包括 HTTPException）时回滚
+                return job(db)
+            except OperationalError as e:
+                db.rollback()
+                if not is_lock_error(e) or attempt >= settings.db_write_retries:
+                    raise
+                delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.5)
+                attempt += 1
+                logger.info("Database locked, retrying write in %.3fs (attempt %s)", delay, attempt)
+                time.sleep(delay)
+            except BaseException:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+    def submit(self, job: Callable[[Session], Any]) -> Future:
+        future: Future = Future()
+        self._ensure_thread()
+        self._queue.put((job, future))
+        return future
+
+    def run(self, job: Callable[[Session], Any]) -> Any:
+        """Run job(session) on the writer thread and wait for its result (or exception)"""
+        return self.submit(job).result()
+
+db_writer = DatabaseWriter()
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, List, Optional, Set, Tuple
+from .database import settings
+from .shared_memory import shared_array, shared_lock, shared_value
+
+logger = logging.getLogger(__name__)
+
+# Events shared by all gunicorn workers through a ring buffer in shared memory (see
+# core.shared_memory). Publishers (any thread, any worker) append; each worker polls the
+# sequence number and fans new events out to its own stream subscribers.
+RING_SLOTS = 256
+SLOT_BYTES = 256  # event type + small JSON payload (ids and counts)
+
+_ring = shared_array("event ring", 'c', RING_SLOTS * SLOT_BYTES)
+_ring_lengths = shared_array("event ring", 'i', RING_SLOTS)
+_ring_sequences = shared_array("event ring", 'q', RING_SLOTS)
+_last_sequence = shared_value("event ring", 'q', 0)
+_ring_lock = shared_lock("event ring")
+
+# Pseudo event telling clients they missed events (ring overrun, slow client) and should reload
+RESYNC = "resync"
+
+def publish_event(event_type: str, **data) -> None:
+    """Append an event for the stream subscribers of every worker. Safe from any thread."""
+    raw = json.dumps({"type": event_type, **data}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) > SLOT_BYTES:
+        raise ValueError(f"Event payload too large ({len(raw)} > {SLOT_BYTES} bytes)")
+    with _ring_lock:
+        sequence = _last_sequence.value + 1
+        slot = sequence % RING_SLOTS
+        _ring[slot * SLOT_BYTES:slot * SLOT_BYTES + len(raw)] = raw
+        _ring_lengths[slot] = len(raw)
+        _ring_sequences[slot] = sequence
+        _last_sequence.value = sequence
+
+def _read_events(after: int) -> Tuple[int, List[dict], bool]:
+    """(last sequence, events published after `after`, whether some were already overwritten)"""
+    with _ring_lock:
+        last = _last_sequence.value
+        if last == after:
+            return last, [], False
+        first = max(after + 1, last - RING_SLOTS + 1)
+        events = []
+        for sequence in range(first, last + 1):
+            slot = sequence % RING_SLOTS
+            if _ring_sequences[slot] == sequence:
+                events.append(json.loads(_ring[slot * SLOT_BYTES:slot * SLOT_BYTES + _ring_lengths[slot]]))
+    return last, events, first > after + 1
+
+class EventHub:
+    """
+    Per-worker fan-out of published events to stream subscribers.
+
+    One polling task per worker reads the shared ring (a lock and an integer compare when
+    nothing happened) and copies new events into every subscriber's queue. A subscriber
+    that falls behind gets a resync event instead of an unbounded backlog.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._poller: Optional[asyncio.Task] = None
+
+    async def _poll(self) -> None:
+        last = _last_sequence.value
+        try:
+            while self._subscribers:
+                await asyncio.sleep(settings.event_stream_poll_ms / 1000)
+                try:
+                    last, events, missed = _read_events(last)
+                except Exception:
+                    # 单次读取失败（如损坏的槽位）不应让所有订阅者从此收不到事件
+                    logger.exception("Reading the event ring failed, asking subscribers to resync")
+                    last, events, missed = _last_sequence.value, [], True
+                if missed:
+                    events.insert(0, {"type": RESYNC})
+                for event in events:
+                    for subscriber in list(self._subscribers):
+                        self._deliver(subscriber, event)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Event stream poller stopped")
+        finally:
+            # 下一个 subscribe() 会重新启动轮询
+            if self._poller is asyncio.current_task():
+                self._poller = None
+
+    def _deliver(self, subscriber: asyncio.Queue, event: dict) -> None:
+        try:
+            subscriber.put_nowait(event)
+        except asyncio.QueueFull:
+            # 客户端太慢：丢弃积压，让它重新加载
+            while not subscriber.empty():
+                subscriber.get_nowait()
+            subscriber.put_nowait({"type": RESYNC})
+
+    async def subscribe(self) -> AsyncIterator[Optional[dict]]:
+        """Yield events as they arrive, and None every event_stream_heartbeat seconds of silence"""
+        subscriber: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(subscriber)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.get(), settings.event_stream_heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._subscribers.discard(subscriber)
+
+event_hub = EventHub()
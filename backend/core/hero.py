@@ -0,0 +1,80 @@
+import fnmatch
+import random
+import threading
+from typing import List, Optional, Tuple
+from .database import settings
+from .media_index import get_media_index, MediaSnapshot
+from .shared_memory import shared_lock, shared_value
+
+HERO_DIR = 'pic'
+
+# The hero endpoint is hit on every page load; only stat() the directory this often
+HERO_CHECK_INTERVAL = 30.0
+
+# Deck position shared by all gunicorn workers (see core.shared_memory), so no image
+# repeats until the whole deck has been shown
+_position = shared_value("hero deck position", 'Q', 0)
+_position_lock = shared_lock("hero deck position")
+
+def _next_position() -> int:
+    with _position_lock:
+        position = _position.value
+        _position.value = position + 1
+    return position
+
+class HeroDeck:
+    """
+    Shuffle-deck picker over the cached media/pic index.
+
+    Every worker derives the same shuffled deck from (directory version, cycle number),
+    so a shared counter is all that is needed to deal cards without repeats. Weights from
+    settings.hero_weights (filename glob -> integer copies per deck, 0 excludes) let some
+    images come up more often. A pick is O(1); the deck is rebuilt once per cycle.
+    """
+
+    def __init__(self, subdir: str = HERO_DIR):
+        self.index = get_media_index(subdir)
+        self._lock = threading.Lock()
+        self._cards_version = None
+        self._cards: List[int] = []
+        self._deck_key: Optional[Tuple[str, int]] = None
+        self._deck: List[int] = []
+
+    def _weight(self, filename: str) -> int:
+        for pattern, weight in settings.hero_weights.items():
+            if fnmatch.fnmatch(filename, pattern):
+                return max(0, int(weight))
+        return 1
+
+    def _get_cards(self, snapshot: MediaSnapshot) -> List[int]:
+        # 每张图按权重放入若干张"牌"
+        if self._cards_version != snapshot.version:
+            cards = []
+            for position, entry in enumerate(snapshot.entries):
+                cards.extend([position] * self._weight(entry["filename"]))
+            self._cards = cards
+            self._cards_version = snapshot.version
+        return self._cards
+
+    def pick(self) -> Optional[dict]:
+        """Next image entry of the deck, or None if there are no images"""
+        snapshot = self.index.snapshot(max_age=HERO_CHECK_INTERVAL)
+        if not snapshot:
+            return None
+
+        with self._lock:
+            cards = self._get_cards(snapshot)
+            if not cards:
+                return None
+
+            cycle, offset = divmod(_next_position(), len(cards))
+            key = (snapshot.version, cycle)
+            if key != self._deck_key:
+                deck = list(cards)
+                random.Random(f"{snapshot.version}:{cycle}").shuffle(deck)
+                self._deck = deck
+                self._deck_key = key
+
+            return snapshot.entries[self._deck[offset]]
+
+hero_deck = HeroDeck()
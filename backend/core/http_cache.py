@@ -0,0 +1,36 @@
+import hashlib
+from typing import Any, Callable, Optional
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+# Let browsers/CDN store the response but revalidate it on every use
+CACHE_CONTROL = "public, no-cache"
+
+def make_etag(request: Request, version: str) -> str:
+    """Strong ETag for one data version and the exact request path + query"""
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{version}|{request.url.path}|{query}".encode("utf-8")).hexdigest()
+    return f'"{digest[:24]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def conditional_response(request: Request, version: str, build: Callable[[], Any]) -> Response:
+    """
+    Answer If-None-Match with 304 without calling build(); otherwise serialize build() as JSON.
+
+    `version` must change whenever the underlying data changes (media directory mtime,
+    table_versions row, ...) and be identical across worker processes.
+    """
+    etag = make_etag(request, version)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(build()), headers=headers)
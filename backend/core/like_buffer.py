@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from models import Message, MessageLike
+from .database import settings
+from .db_writer import db_writer
+
+# (message id, client ip, True to like / False to unlike, future of the new likes_count)
+LikeEvent = Tuple[int, str, bool, Future]
+
+def _like(session: Session, message_id: int, client_ip: str) -> int:
+    if session.scalar(select(Message.id).where(Message.id == message_id, Message.status == "approved")) is None:
+        raise HTTPException(status_code=404, detail="Message not found or not approved")
+    # 唯一索引 (message_id, ip_address) 判断是否已点赞，不再先查后写
+    inserted = session.execute(
+        insert(MessageLike).values(message_id=message_id, ip_address=client_ip).on_conflict_do_nothing()
+    ).rowcount
+    if not inserted:
+        raise HTTPException(status_code=400, detail="You have already liked this message")
+    return session.scalar(
+        update(Message).where(Message.id == message_id)
+        .values(likes_count=Message.likes_count + 1)
+        .returning(Message.likes_count)
+    )
+
+def _unlike(session: Session, message_id: int, client_ip: str) -> int:
+    if session.scalar(select(Message.id).where(Message.id == message_id)) is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    deleted = session.execute(
+        delete(MessageLike).where(MessageLike.message_id == message_id, MessageLike.ip_address == client_ip)
+    ).rowcount
+    if not deleted:
+        raise HTTPException(status_code=400, detail="You haven't liked this message")
+    return session.scalar(
+        update(Message).where(Message.id == message_id)
+        .values(likes_count=func.max(Message.likes_count - 1, 0))
+        .returning(Message.likes_count)
+    )
+
+class LikeBuffer:
+    """
+    Per-process buffer of like/unlike events, written in batched transactions.
+
+    Events queued within like_flush_interval_ms (up to like_batch_size) are applied by the
+    writer thread in one transaction and one commit, instead of one commit per request.
+    Every event is still checked on its own (404 / already liked) and changes likes_count
+    with a single atomic UPDATE, so concurrent likes from other workers are never lost.
+    Callers wait on the returned future, which resolves once the batch is committed.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[LikeEvent]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="like-buffer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + settings.like_flush_interval_ms / 1000
+            while len(batch) < settings.like_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: List[LikeEvent]) -> None:
+        def write(session: Session) -> List[Any]:
+            # 单个事件的 404/400 只影响它自己，不回滚整批
+            results: List[Any] = []
+            for message_id, client_ip, liked, _ in batch:
+                try:
+                    results.append((_like if liked else _unlike)(session, message_id, client_ip))
+                except HTTPException as e:
+                    results.append(e)
+            session.commit()
+            return results
+
+        try:
+            results = db_writer.run(write)
+        except BaseException as e:
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+        for (*_, future), result in zip(batch, results):
+            if isinstance(result, HTTPException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def submit(self, message_id: int, client_ip: str, liked: bool) -> Future:
+        """Queue a like (liked=True) or unlike; the future resolves to the new likes_count"""
+        future: Future = Future()
+        self._ensure_thread()
+        self._queue.put((message_id, client_ip, liked, future))
+        return future
+
+like_buffer = LikeBuffer()
@@ -0,0 +1,269 @@
+import base64
+import binascii
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from .database import settings
+from .media_metadata import load_metadata, schedule_metadata_sync
+from .media_serving import versioned_url
+from .thumbnails import variant_lookup
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+# Sort key used for files without a parsable date (same fallback the endpoints always used)
+UNDATED_SORT_KEY = "1900-01-01"
+
+def _sort_key(entry: dict) -> Tuple[str, str]:
+    return (entry["date"] or UNDATED_SORT_KEY, entry["filename"])
+
+def encode_cursor(entry: dict) -> str:
+    """Opaque pagination cursor pointing just after the given entry"""
+    date_key, filename = _sort_key(entry)
+    raw = f"{date_key}\n{filename}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    date_key, sep, filename = raw.partition("\n")
+    if not sep or not date_key or not filename:
+        raise ValueError("Invalid cursor")
+    return (date_key, filename)
+
+class MediaSnapshot:
+    """
+    Immutable result of one directory scan. Shared between requests, never mutate.
+
+    Entries are sorted by date (newest first), so all photos of one year or one
+    (year, month) form a contiguous run. Those runs and their counts are computed
+    once here, which turns the year/month endpoints into list slices.
+    """
+
+    def __init__(self, dated: List[Tuple[Optional[datetime], dict]], version: str = ""):
+        # Directory mtime at scan time; identical in every worker, used for ETags
+        self.version = version
+        self.entries: List[dict] = [entry for _, entry in dated]
+        self.dates: List[Optional[datetime]] = [file_date for file_date, _ in dated]
+        self.filenames: List[str] = [entry["filename"] for entry in self.entries]
+        self.sort_keys: List[Tuple[str, str]] = [_sort_key(entry) for entry in self.entries]
+
+        # (start, end) offsets into entries
+        self.year_ranges: Dict[int, Tuple[int, int]] = {}
+        self.month_ranges: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for position, file_date in enumerate(self.dates):
+            if file_date is None:
+                continue
+            start, _ = self.year_ranges.get(file_date.year, (position, position))
+            self.year_ranges[file_date.year] = (start, position + 1)
+            key = (file_date.year, file_date.month)
+            start, _ = self.month_ranges.get(key, (position, position))
+            self.month_ranges[key] = (start, position + 1)
+
+        # Prebuilt summaries, newest first
+        self.years: List[dict] = [
+            {"year": year, "photo_count": end - start}
+            for year, (start, end) in sorted(self.year_ranges.items(), reverse=True)
+        ]
+        self.months_by_year: Dict[int, List[dict]] = {}
+        for (year, month), (start, end) in sorted(self.month_ranges.items(), reverse=True):
+            self.months_by_year.setdefault(year, []).append({"month": month, "photo_count": end - start})
+
+    def year_photos(self, year: int) -> List[dict]:
+        start, end = self.year_ranges.get(year, (0, 0))
+        return self.entries[start:end]
+
+    def month_photos(self, year: int, month: int) -> List[dict]:
+        start, end = self.month_ranges.get((year, month), (0, 0))
+        return self.entries[start:end]
+
+    def months(self, year: int) -> List[dict]:
+        return self.months_by_year.get(year, [])
+
+    def page(self, cursor: Optional[str], limit: Optional[int]) -> Tuple[List[dict], Optional[str]]:
+        """
+        Return (photos, next_cursor) for keyset pagination over the sorted entries.
+
+        The cursor encodes the (date, filename) of the last photo already seen, so a
+        page stays stable when files are added or removed between requests.
+        """
+        start = 0
+        if cursor:
+            key = decode_cursor(cursor)
+            # First position whose key sorts strictly after the cursor (keys are descending)
+            low, high = 0, len(self.sort_keys)
+            while low < high:
+                middle = (low + high) // 2
+                if self.sort_keys[middle] >= key:
+                    low = middle + 1
+                else:
+                    high = middle
+            start = low
+
+        if limit is None:
+            return self.entries[start:], None
+
+        photos = self.entries[start:start + limit]
+        next_cursor = encode_cursor(photos[-1]) if photos and start + limit < len(self.entries) else None
+        return photos, next_cursor
+
+EMPTY_SNAPSHOT = MediaSnapshot([])
+
+class MediaDirectoryIndex:
+    """
+    Per-process cache of one directory under settings.media_root.
+
+    The directory is listed and parsed once; afterwards every access costs a single
+    os.stat() and the listing is only rebuilt when the directory mtime changes
+    (a file was added, removed or renamed) or when refresh(force=True) is called.
+    """
+
+    def __init__(
+        self,
+        subdir: str,
+        date_parser: Optional[Callable[[str], Optional[datetime]]] = None,
+        extensions: tuple = IMAGE_EXTENSIONS,
+        with_thumbnails: bool = True,
+        with_metadata: bool = True
+    ):
+        self.subdir = subdir
+        self.date_parser = date_parser
+        self.extensions = extensions
+        self.with_thumbnails = with_thumbnails
+        self.with_metadata = with_metadata
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._mtime_ns = None
+        self._checked_at = 0.0
+        self._snapshot = EMPTY_SNAPSHOT
+
+    @property
+    def path(self) -> str:
+        return os.path.join(settings.media_root, self.subdir)
+
+    def _file_mtime(self, filename: str) -> Optional[float]:
+        try:
+            return os.stat(os.path.join(self.path, filename)).st_mtime
+        except OSError:
+            return None
+
+    def _scan(self, mtime_ns: int) -> MediaSnapshot:
+        filenames = [f for f in os.listdir(self.path) if f.lower().endswith(self.extensions)]
+        variants = variant_lookup(self.subdir) if self.with_thumbnails else None
+        metadata = load_metadata(self.subdir) if self.with_metadata else {}
+
+        dated = []
+        for filename in filenames:
+            file_date = self.date_parser(filename) if self.date_parser else None
+            file_metadata = metadata.get(filename)
+            # 文件名没有日期时，用 EXIF 拍摄时间
+            if file_date is None and file_metadata is not None and file_metadata.taken_at:
+                file_date = file_metadata.taken_at
+            entry = {
+                "filename": filename,
+                "url": versioned_url(f"{settings.media_url}{self.subdir}/{filename}", self._file_mtime(filename)),
+                "date": file_date.isoformat() if file_date else None
+            }
+            # 缩略图由 commands.thumbnails 生成，存在时附带 srcset
+            if variants:
+                entry.update(variants(filename) or {})
+            # 尺寸/主色/占位图由后台元数据同步提取，存在时附带
+            if file_metadata is not None and file_metadata.width:
+                entry.update({
+                    "width": file_metadata.width,
+                    "height": file_metadata.height,
+                    "dominant_color": file_metadata.dominant_color,
+                    "placeholder": file_metadata.placeholder
+                })
+            dated.append((file_date, entry))
+
+        # 按日期排序（最新的在前），同一天按文件名排序保证顺序稳定
+        dated.sort(key=lambda x: _sort_key(x[1]), reverse=True)
+        return MediaSnapshot(dated, version=f"{mtime_ns:x}")
+
+    def refresh(self, force: bool = False, max_age: float = 0.0) -> bool:
+        """
+        Rescan the directory if it changed. Returns False if the directory does not exist.
+
+        With max_age > 0 the mtime check itself is skipped when the last one happened
+        less than max_age seconds ago, so very hot callers do not even stat().
+        """
+        now = time.monotonic()
+        if not force and max_age and self._mtime_ns is not None and now - self._checked_at < max_age:
+            return True
+        self._checked_at = now
+
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            with self._lock:
+                if self._mtime_ns is not None:
+                    self._mtime_ns = None
+                    self._snapshot = EMPTY_SNAPSHOT
+                    self.generation += 1
+            return False
+
+        if force or mtime_ns != self._mtime_ns:
+            with self._lock:
+                if force or mtime_ns != self._mtime_ns:
+                    self._snapshot = self._scan(mtime_ns)
+                    self._mtime_ns = mtime_ns
+                    self.generation += 1
+            # 目录有变化时在后台提取新文件的元数据，请求路径上从不解码图片
+            if self.with_metadata:
+                schedule_metadata_sync(self.subdir)
+        return True
+
+    def snapshot(self, max_age: float = 0.0) -> Optional[MediaSnapshot]:
+        """Current snapshot, or None if the directory does not exist"""
+        if not self.refresh(max_age=max_age):
+            return None
+        return self._snapshot
+
+    def entries(self) -> Optional[List[dict]]:
+        """Date-sorted entries (newest first), or None if the directory does not exist"""
+        snapshot = self.snapshot()
+        return snapshot.entries if snapshot else None
+
+    def filenames(self) -> Optional[List[str]]:
+        """Filenames in the same order as entries(), or None if the directory does not exist"""
+        snapshot = self.snapshot()
+        return snapshot.filenames if snapshot else None
+
+_indexes: Dict[str, MediaDirectoryIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_media_index(
+    subdir: str,
+    date_parser: Optional[Callable[[str], Optional[datetime]]] = None
+) -> MediaDirectoryIndex:
+    """Return the process-wide index for a media sub-directory, creating it on first use"""
+    with _indexes_lock:
+        index = _indexes.get(subdir)
+        if index is None:
+            index = MediaDirectoryIndex(subdir, date_parser)
+            _indexes[subdir] = index
+        return index
+
+def rescan_media_indexes() -> Dict[str, Optional[int]]:
+    """
+    Force a rescan of every registered index. Returns file counts (None for missing directories).
+
+    The directory mtime is bumped as well, so the other gunicorn workers pick up the
+    change on their next access instead of only the worker that served this call.
+    """
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+
+    result = {}
+    for index in indexes:
+        try:
+            os.utime(index.path)
+        except OSError:
+            pass
+        result[index.subdir] = len(index._snapshot.entries) if index.refresh(force=True) else None
+    return result
@@ -0,0 +1,204 @@
+import base64
+import fcntl
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from sqlalchemy import delete, insert, select
+from .database import settings, SessionLocal
+from .db_writer import chunks
+from models import MediaMetadata
+
+logger = logging.getLogger(__name__)
+
+# Directories whose images get a metadata row by default
+METADATA_SOURCE_DIRS = ('wall-pic', 'weibo', 'pic')
+
+PLACEHOLDER_SIZE = 16
+
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+EXIF_ORIENTATION = 0x0112
+
+def _parse_exif_datetime(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value).strip("\x00 ")[:19], "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+
+def extract_image_metadata(path: str) -> Optional[dict]:
+    """
+    Read width/height, EXIF capture date, dominant color and a tiny LQIP placeholder.
+
+    Runs inside worker processes, so it only takes picklable arguments.
+    Returns None if the file cannot be decoded.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(path) as image:
+            exif = image.getexif()
+            taken_at = (
+                _parse_exif_datetime(exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL))
+                or _parse_exif_datetime(exif.get(EXIF_DATETIME))
+            )
+
+            # 尺寸取自文件头，按 EXIF 方向换算成显示尺寸
+            width, height = image.size
+            if exif.get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+                width, height = height, width
+
+            image.draft("RGB", (64, 64))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+    small = image.copy()
+    small.thumbnail((64, 64))
+    palette = small.quantize(colors=5)
+    counts = sorted(palette.getcolors(), reverse=True)
+    red, green, blue = palette.getpalette()[counts[0][1] * 3:counts[0][1] * 3 + 3]
+
+    placeholder = image.copy()
+    placeholder.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = io.BytesIO()
+    placeholder.save(buffer, format="WEBP", quality=40)
+
+    return {
+        "width": width,
+        "height": height,
+        "taken_at": taken_at,
+        "dominant_color": f"#{red:02x}{green:02x}{blue:02x}",
+        "placeholder": "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii"),
+    }
+
+def load_metadata(subdir: str) -> Dict[str, MediaMetadata]:
+    """filename -> metadata row for one directory (used once per media index scan)"""
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(MediaMetadata).where(MediaMetadata.subdir == subdir)).scalars().all()
+        return {os.path.basename(row.path): row for row in rows}
+    finally:
+        db.close()
+
+def sync_media_metadata(
+    subdirs: Iterable[str] = METADATA_SOURCE_DIRS,
+    workers: Optional[int] = None
+) -> Dict[str, Dict[str, int]]:
+    """
+    Extract metadata for new or modified images and drop rows of deleted ones.
+
+    Files are matched by (path, mtime, size), so every image is decoded once. With
+    workers=1 extraction runs inline (used by the in-app background thread); otherwise
+    a process pool is used. When a directory changed, its mtime is bumped so the
+    per-process media indexes reload the metadata.
+    """
+    from .media_index import IMAGE_EXTENSIONS
+
+    report = {}
+    executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    db = SessionLocal()
+    try:
+        for subdir in subdirs:
+            source_dir = os.path.join(settings.media_root, subdir)
+            if not os.path.isdir(source_dir):
+                continue
+
+            existing = {
+                path: (mtime, size)
+                for path, mtime, size in db.execute(
+                    select(MediaMetadata.path, MediaMetadata.mtime, MediaMetadata.size)
+                    .where(MediaMetadata.subdir == subdir)
+                )
+            }
+
+            current = {}
+            with os.scandir(source_dir) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        stat = entry.stat()
+                        current[f"{subdir}/{entry.name}"] = (entry.path, stat.st_mtime, stat.st_size)
+
+            pending = [
+                (path, source, mtime, size)
+                for path, (source, mtime, size) in current.items()
+                if existing.get(path) != (mtime, size)
+            ]
+            removed = [path for path in existing if path not in current]
+
+            sources = [source for _, source, _, _ in pending]
+            if executor:
+                results = executor.map(extract_image_metadata, sources, chunksize=16)
+            else:
+                results = map(extract_image_metadata, sources)
+
+            rows = []
+            for (path, _, mtime, size), metadata in zip(pending, results):
+                rows.append({
+                    "path": path,
+                    "subdir": subdir,
+                    "mtime": mtime,
+                    "size": size,
+                    **(metadata or {"width": None, "height": None, "taken_at": None,
+                                    "dominant_color": "", "placeholder": ""}),
+                })
+
+            # 分批写入，每批一个事务
+            for chunk in chunks(rows):
+                db.execute(delete(MediaMetadata).where(MediaMetadata.path.in_([row["path"] for row in chunk])))
+                db.execute(insert(MediaMetadata), chunk)
+                db.commit()
+            for chunk in chunks(removed):
+                db.execute(delete(MediaMetadata).where(MediaMetadata.path.in_(chunk)))
+                db.commit()
+
+            if rows or removed:
+                os.utime(source_dir)
+            report[subdir] = {"extracted": len(rows), "removed": len(removed), "unchanged": len(current) - len(rows)}
+    finally:
+        db.close()
+        if executor:
+            executor.shutdown()
+
+    return report
+
+_background_lock = threading.Lock()
+_background_pending = set()
+_background_running = False
+
+def _run_background_sync() -> None:
+    global _background_running
+    while True:
+        with _background_lock:
+            if not _background_pending:
+                _background_running = False
+                return
+            subdirs = sorted(_background_pending)
+            _background_pending.clear()
+
+        # 多个 gunicorn worker 之间同一时间只有一个在提取，其余等待后基本是空操作
+        try:
+            with open(settings.metadata_sync_lock, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    sync_media_metadata(subdirs, workers=1)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        except Exception:
+            logger.exception("Background media metadata sync failed for %s", subdirs)
+
+def schedule_metadata_sync(subdir: str) -> None:
+    """Queue a background metadata sync for one directory (called after a media index rescan)"""
+    global _background_running
+    with _background_lock:
+        _background_pending.add(subdir)
+        if _background_running:
+            return
+        _background_running = True
+    threading.Thread(target=_run_background_sync, name="media-metadata-sync", daemon=True).start()
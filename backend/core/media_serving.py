@@ -0,0 +1,70 @@
+import os
+from typing import Optional
+from urllib.parse import quote
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response
+from .database import settings
+from .http_cache import etag_matches
+
+# URLs returned by the API carry the file's version (?v=<mtime hex>, see versioned_media_url),
+# which changes whenever the file does, so they can be cached forever. Plain URLs may point at
+# a file replaced in place: keep them briefly, then revalidate with the ETag.
+DEFAULT_CACHE_CONTROL = "public, max-age=300"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def media_relative_path(file_path: str) -> str:
+    """Turn a stored path such as "/media/videos/a.mp4" or "videos/a.mp4" into "videos/a.mp4" """
+    if file_path.startswith(settings.media_url):
+        file_path = file_path[len(settings.media_url):]
+    return file_path.lstrip("/")
+
+def resolve_media_path(relative_path: str) -> str:
+    """Absolute path of a file inside media_root. 404 for missing files or paths escaping the root."""
+    media_root = os.path.realpath(settings.media_root)
+    path = os.path.realpath(os.path.join(media_root, relative_path))
+    if os.path.commonpath([media_root, path]) != media_root or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return path
+
+def media_version(mtime: float) -> str:
+    return f"{int(mtime):x}"
+
+def media_file_version(path: str) -> str:
+    return media_version(os.stat(path).st_mtime)
+
+def versioned_url(url: str, mtime: Optional[float]) -> str:
+    return f"{url}?v={media_version(mtime)}" if mtime is not None else url
+
+def versioned_media_url(file_path: str, mtime: Optional[float]) -> str:
+    """Public URL of a stored media path with ?v=<version of mtime>; never stats the file"""
+    if "://" in file_path:
+        return file_path
+    return versioned_url(f"{settings.media_url}{media_relative_path(file_path)}", mtime)
+
+def _etag(stat: os.stat_result) -> str:
+    return f'"{media_version(stat.st_mtime)}-{stat.st_size:x}"'
+
+def media_file_response(relative_path: str, version: Optional[str] = None,
+                        if_none_match: Optional[str] = None) -> Response:
+    """
+    Serve one media file.
+
+    In "accel" mode the app only resolves and authorizes the path and hands the transfer to
+    nginx via X-Accel-Redirect (nginx then handles sendfile, Range requests and
+    conditional GETs). In "static" mode (development, no nginx) the file is streamed by Python,
+    and if_none_match (the request's If-None-Match header) is answered with 304.
+    """
+    path = resolve_media_path(relative_path)
+    relative_path = os.path.relpath(path, os.path.realpath(settings.media_root)).replace(os.sep, "/")
+    immutable = version is not None and version == media_file_version(path)
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL}
+
+    if settings.media_serving == "accel":
+        headers["X-Accel-Redirect"] = settings.media_accel_location + quote(relative_path)
+        return Response(headers=headers)
+
+    stat = os.stat(path)
+    headers["ETag"] = _etag(stat)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers, stat_result=stat)
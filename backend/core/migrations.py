@@ -0,0 +1,160 @@
+import logging
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+# (version, name, upgrade) in order. Migrations change tables that already exist in deployed
+# databases; brand-new tables are still created by Base.metadata.create_all. Every statement
+# must be idempotent, because a fresh database already gets the models' indexes from create_all.
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = []
+
+def migration(version: int, name: str):
+    def register(upgrade: Callable[[Connection], None]):
+        MIGRATIONS.append((version, name, upgrade))
+        return upgrade
+    return register
+
+@migration(1, "Hot-path indexes and unique message_likes(message_id, ip_address)")
+def _hot_path_indexes(conn: Connection) -> None:
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_messages_status_approved_at_id ON messages (status, approved_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_messages_status_created_at_id ON messages (status, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_messages_created_at_id ON messages (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_timeline_events_event_date_id ON timeline_events (event_date, id)",
+        "CREATE INDEX IF NOT EXISTS ix_photos_created_at_id ON photos (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_photos_category_created_at_id ON photos (category, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_videos_created_at_id ON videos (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_videos_category_created_at_id ON videos (category, created_at, id)",
+    ):
+        conn.execute(text(statement))
+
+    # 唯一索引之前先去掉重复点赞（保留最早的一条），并修正受影响留言的点赞数
+    affected = [
+        message_id for (message_id,) in conn.execute(text(
+            "SELECT message_id FROM message_likes GROUP BY message_id, ip_address HAVING COUNT(*) > 1"
+        ))
+    ]
+    if affected:
+        conn.execute(text(
+            "DELETE FROM message_likes WHERE id NOT IN "
+            "(SELECT MIN(id) FROM message_likes GROUP BY message_id, ip_address)"
+        ))
+        for message_id in set(affected):
+            conn.execute(
+                text(
+                    "UPDATE messages SET likes_count = "
+                    "(SELECT COUNT(*) FROM message_likes WHERE message_id = :id) WHERE id = :id"
+                ),
+                {"id": message_id}
+            )
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_message_likes_message_id_ip_address "
+        "ON message_likes (message_id, ip_address)"
+    ))
+
+@migration(2, "file_path indexes for the bulk upsert lookup")
+def _file_path_indexes(conn: Connection) -> None:
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_photos_file_path ON photos (file_path)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_videos_file_path ON videos (file_path)"))
+
+def current_version(conn: Connection) -> int:
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+def run_migrations(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """
+    Apply every migration newer than the recorded schema version. Returns the versions applied.
+
+    Each migration runs in its own transaction together with its schema_migrations row, so a
+    failed migration leaves no partial changes and is retried on the next start.
+    """
+    applied = []
+    for version, name, upgrade in sorted(MIGRATIONS):
+        if target is not None and version > target:
+            break
+        with engine.begin() as conn:
+            if version <= current_version(conn):
+                continue
+            logger.info("Applying migration %s: %s", version, name)
+            upgrade(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, CURRENT_TIMESTAMP)"),
+                {"version": version, "name": name}
+            )
+        applied.append(version)
+    return applied
+
+# Queries on the request path that must be served from an index. ORDER BY without a matching
+# index ("USE TEMP B-TREE") sorts the whole table and counts as a full scan too.
+HOT_QUERIES: Dict[str, Tuple[str, dict]] = {
+    "get_approved_messages": (
+        "SELECT * FROM messages WHERE status = 'approved' ORDER BY approved_at DESC, id DESC LIMIT 21",
+        {},
+    ),
+    "get_approved_messages (cursor)": (
+        "SELECT * FROM messages WHERE status = 'approved' AND (approved_at, id) < (:sort, :id) "
+        "ORDER BY approved_at DESC, id DESC LIMIT 21",
+        {"sort": "2100-01-01 00:00:00", "id": 1},
+    ),
+    "get_all_messages_admin": (
+        "SELECT * FROM messages ORDER BY created_at DESC, id DESC LIMIT 51",
+        {},
+    ),
+    "get_all_messages_admin (status)": (
+        "SELECT * FROM messages WHERE status = :status ORDER BY created_at DESC, id DESC LIMIT 51",
+        {"status": "pending"},
+    ),
+    "like lookup": (
+        "SELECT id FROM message_likes WHERE message_id = :id AND ip_address = :ip",
+        {"id": 1, "ip": "127.0.0.1"},
+    ),
+    "like status (bulk)": (
+        "SELECT message_id FROM message_likes WHERE message_id IN (1, 2, 3) AND ip_address = :ip",
+        {"ip": "127.0.0.1"},
+    ),
+    "get_timeline_events": (
+        "SELECT * FROM timeline_events ORDER BY event_date DESC, id DESC LIMIT 101",
+        {},
+    ),
+    "get_photos": (
+        "SELECT * FROM photos ORDER BY created_at DESC, id DESC LIMIT 101",
+        {},
+    ),
+    "get_photos (category)": (
+        "SELECT * FROM photos WHERE category = :category ORDER BY created_at DESC, id DESC LIMIT 101",
+        {"category": "life"},
+    ),
+    "get_videos": (
+        "SELECT * FROM videos ORDER BY created_at DESC, id DESC LIMIT 101",
+        {},
+    ),
+    "bulk upsert lookup (photos)": (
+        "SELECT id, file_path FROM photos WHERE file_path IN (:path, :media_path)",
+        {"path": "wall-pic/a.jpg", "media_path": "/media/wall-pic/a.jpg"},
+    ),
+    "bulk upsert lookup (videos)": (
+        "SELECT id, file_path FROM videos WHERE file_path IN (:path, :media_path)",
+        {"path": "videos/a.mp4", "media_path": "/media/videos/a.mp4"},
+    ),
+    "get_videos (category)": (
+        "SELECT * FROM videos WHERE category = :category ORDER BY created_at DESC, id DESC LIMIT 101",
+        {"category": "life"},
+    ),
+}
+
+# "SCAN messages" is a full table scan; "SCAN messages USING INDEX ..." walks an index in order
+_FULL_SCAN = re.compile(r"^SCAN \w+$|USE TEMP B-TREE FOR ORDER BY")
+
+def check_query_plans(engine: Engine) -> Dict[str, str]:
+    """EXPLAIN QUERY PLAN every hot query. Returns {query name: offending plan line} for full scans."""
+    failures = {}
+    with engine.connect() as conn:
+        for name, (sql, params) in HOT_QUERIES.items():
+            for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params):
+                detail = row[-1]
+                if _FULL_SCAN.search(detail):
+                    failures[name] = detail
+                    break
+    return failures
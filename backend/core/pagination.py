@@ -0,0 +1,72 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, String, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Response header carrying the cursor of the next page (list bodies stay plain JSON arrays)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    raw = json.dumps([sort_value, row_id], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """Inverse of encode_cursor. 400 for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if not isinstance(row_id, int):
+            raise ValueError
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, row_id
+
+async def paginate(
+    db: AsyncSession,
+    statement: Select,
+    sort_column,
+    id_column,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> List[Any]:
+    """
+    Order a select() of one entity by (sort_column, id_column) descending and return one page.
+
+    With a cursor the page starts right after the row it encodes, using a row-value
+    comparison that an index on (sort column, id) can seek to, so deep pages cost the
+    same as the first and rows inserted meanwhile never shift the page. Rows whose sort
+    value is NULL come last (SQLite's descending order) and are paged by id. Without one,
+    skip/offset is used as before. Either way the cursor of the following page, if
+    there is one, is returned in the X-Next-Cursor header.
+    """
+    # 用数据库中存储的原始值做游标，避免 datetime 转换后字符串格式（是否带微秒）不一致
+    sort_key = type_coerce(sort_column, String)
+    statement = statement.add_columns(sort_key.label("cursor_sort_key")).order_by(sort_column.desc(), id_column.desc())
+    # SQLite 降序时 NULL 排在最后；行值比较遇到 NULL 结果为 NULL，所以 NULL 部分单独查询
+    null_rows = statement.where(sort_column.is_(None))
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        if sort_value is None:
+            statement = null_rows.where(id_column < row_id)
+        else:
+            statement = statement.where(tuple_(sort_key, id_column) < tuple_(sort_value, row_id))
+    elif skip:
+        statement = statement.offset(skip)
+
+    rows = (await db.execute(statement.limit(limit + 1))).all()
+    if cursor and sort_value is not None and len(rows) <= limit:
+        # 非 NULL 部分已取完，接着取 NULL 部分（各自都能按索引定位）
+        rows += (await db.execute(null_rows.limit(limit + 1 - len(rows)))).all()
+    items = [row[0] for row in rows[:limit]]
+    if len(rows) > limit:
+        last, last_sort_value = rows[limit - 1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            None if last_sort_value is None else str(last_sort_value),
+            getattr(last, id_column.key)
+        )
+    return items
@@ -0,0 +1,125 @@
+import os
+from typing import Dict, Iterable
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.sql import func
+from .database import settings, SessionLocal
+from .db_writer import chunks
+from .media_serving import media_relative_path
+from models import Photo, PhotoSource
+
+# Directories under media_root imported into the photos table by default
+PHOTO_IMPORT_DIRS = ('wall-pic', 'weibo', 'pic')
+
+def import_photos(
+    subdirs: Iterable[str] = PHOTO_IMPORT_DIRS,
+    category: str = "life",
+    prune: bool = True
+) -> Dict[str, Dict[str, int]]:
+    """
+    Sync image files under media_root into the photos table.
+
+    Files are diffed against existing Photo.file_path rows by (path, size, mtime), kept in
+    photo_sources. New files become Photo rows titled after the filename, changed files only
+    get their source row and updated_at refreshed (titles edited by an admin are kept), and
+    rows whose file is gone are deleted unless prune is False. All writes are bulk
+    statements, one transaction per chunk.
+    """
+    from .media_index import IMAGE_EXTENSIONS
+
+    report = {}
+    db = SessionLocal()
+    try:
+        for subdir in subdirs:
+            source_dir = os.path.join(settings.media_root, subdir)
+            if not os.path.isdir(source_dir):
+                continue
+
+            current = {}
+            with os.scandir(source_dir) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        stat = entry.stat()
+                        current[f"{subdir}/{entry.name}"] = (stat.st_size, stat.st_mtime)
+
+            # 同时兼容 "/media/wall-pic/x.jpg" 和 "wall-pic/x.jpg" 两种存储形式
+            existing = {}
+            rows = db.execute(
+                select(Photo.id, Photo.file_path, PhotoSource.size, PhotoSource.mtime)
+                .outerjoin(PhotoSource, PhotoSource.photo_id == Photo.id)
+                .where(or_(
+                    Photo.file_path.startswith(f"{settings.media_url}{subdir}/"),
+                    Photo.file_path.startswith(f"{subdir}/")
+                ))
+                .order_by(Photo.id)
+            )
+            for photo_id, file_path, size, mtime in rows:
+                existing.setdefault(media_relative_path(file_path), (photo_id, size, mtime))
+
+            added = [path for path in current if path not in existing]
+            changed = [
+                path for path, (photo_id, size, mtime) in existing.items()
+                if path in current and current[path] != (size, mtime)
+            ]
+            removed = [photo_id for path, (photo_id, _, _) in existing.items() if path not in current]
+
+            for chunk in chunks(added):
+                db.execute(insert(Photo), [
+                    {
+                        "title": os.path.splitext(os.path.basename(path))[0][:200],
+                        "file_path": f"{settings.media_url}{path}",
+                        "category": category,
+                        "description": "",
+                    }
+                    for path in chunk
+                ])
+                photo_ids = dict(db.execute(
+                    select(Photo.file_path, Photo.id)
+                    .where(Photo.file_path.in_([f"{settings.media_url}{path}" for path in chunk]))
+                ).all())
+                # 照片被删除后遗留的来源行（同一路径）先清掉，否则唯一索引冲突
+                db.execute(delete(PhotoSource).where(PhotoSource.path.in_(chunk)))
+                db.execute(insert(PhotoSource), [
+                    {
+                        "photo_id": photo_ids[f"{settings.media_url}{path}"],
+                        "path": path,
+                        "size": current[path][0],
+                        "mtime": current[path][1],
+                    }
+                    for path in chunk
+                ])
+                db.commit()
+
+            for chunk in chunks(changed):
+                photo_ids = [existing[path][0] for path in chunk]
+                db.execute(delete(PhotoSource).where(or_(
+                    PhotoSource.photo_id.in_(photo_ids), PhotoSource.path.in_(chunk)
+                )))
+                db.execute(insert(PhotoSource), [
+                    {"photo_id": existing[path][0], "path": path, "size": current[path][0], "mtime": current[path][1]}
+                    for path in chunk
+                ])
+                db.execute(
+                    update(Photo).where(Photo.id.in_(photo_ids)).values(updated_at=func.now()),
+                    execution_options={"synchronize_session": False}
+                )
+                db.commit()
+
+            if prune:
+                for chunk in chunks(removed):
+                    db.execute(delete(PhotoSource).where(PhotoSource.photo_id.in_(chunk)))
+                    db.execute(
+                        delete(Photo).where(Photo.id.in_(chunk)),
+                        execution_options={"synchronize_session": False}
+                    )
+                    db.commit()
+
+            report[subdir] = {
+                "inserted": len(added),
+                "updated": len(changed),
+                "deleted": len(removed) if prune else 0,
+                "unchanged": len(current) - len(added) - len(changed),
+            }
+    finally:
+        db.close()
+
+    return report
@@ -0,0 +1,98 @@
+import hashlib
+import math
+import time
+from fastapi import HTTPException, Request
+from .database import settings
+from .shared_memory import shared_array, shared_lock
+
+# Counters shared by all gunicorn workers (see core.shared_memory). Each slot holds
+# (key hash, window number, count in that window, count in the previous window, expires at).
+_FIELDS = 5
+_SLOTS = settings.rate_limit_slots
+_table = shared_array("rate limiter", 'q', _SLOTS * _FIELDS)
+_table_lock = shared_lock("rate limiter")
+
+# Open addressing: a key lives in one of this many slots after its home slot
+MAX_PROBES = 8
+
+def _key_hash(key: str) -> int:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True) or 1  # 0 marks an empty slot
+
+def _find_slot(key_hash: int) -> int:
+    """Slot holding key_hash, else a free or expired one, else the one expiring first"""
+    home = key_hash % _SLOTS
+    candidate, candidate_expires = home, None
+    for probe in range(MAX_PROBES):
+        slot = (home + probe) % _SLOTS
+        base = slot * _FIELDS
+        if _table[base] == key_hash:
+            return slot
+        expires = _table[base + 4] if _table[base] else 0
+        if candidate_expires is None or expires < candidate_expires:
+            candidate, candidate_expires = slot, expires
+    return candidate
+
+class RateLimiter:
+    """
+    Sliding-window limit of `limit` requests per `window` seconds and client IP.
+
+    Uses the sliding window counter approximation: the count of the previous fixed window is
+    weighted by how much of it still overlaps the sliding window. A check is a few array
+    reads under one lock and never touches the database. Call check(request) at the top of
+    the endpoint, i.e. after FastAPI validated the request, so a 422 costs no quota; it
+    raises 429 with Retry-After when the client is over the limit.
+    """
+
+    def __init__(self, name: str, limit: int, window: int, detail: str = "Too many requests. Please try again later."):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.detail = detail
+
+    def hit(self, key: str) -> float:
+        """Count one request for key. Returns 0 if allowed, else the seconds until it would be"""
+        now = time.time()
+        window_number, elapsed = divmod(int(now), self.window)
+        key_hash = _key_hash(f"{self.name}:{key}")
+        with _table_lock:
+            slot = _find_slot(key_hash)
+            base = slot * _FIELDS
+            current = previous = 0
+            if _table[base] == key_hash and _table[base + 4] > now:
+                stored_window = _table[base + 1]
+                if stored_window == window_number:
+                    current, previous = _table[base + 2], _table[base + 3]
+                elif stored_window == window_number - 1:
+                    previous = _table[base + 2]
+
+            weight = 1 - elapsed / self.window
+            allowed = previous * weight + current < self.limit
+            if allowed:
+                current += 1
+            _table[base:base + _FIELDS] = [
+                key_hash, window_number, current, previous, (window_number + 2) * self.window
+            ]
+
+        if allowed:
+            return 0.0
+        if current >= self.limit or not previous:
+            return float(self.window - elapsed + 1)
+        # 上一窗口的权重降到 (limit - current) / previous 以下时即可再次请求
+        return float(max(1, math.ceil(self.window * (1 - (self.limit - current) / previous) - elapsed)))
+
+    def check(self, request: Request) -> None:
+        retry_after = self.hit(request.client.host)
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail=self.detail,
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+message_rate_limit = RateLimiter(
+    "messages", settings.message_rate_limit, settings.message_rate_window,
+    detail="Too many messages. Please wait before submitting again."
+)
+# like 和 unlike 共用一个额度
+like_rate_limit = RateLimiter("likes", settings.like_rate_limit, settings.like_rate_window)
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import settings
+from .http_cache import CACHE_CONTROL, etag_matches, make_etag
+from .table_versions import get_table_version
+
+class ResponseCache:
+    """
+    Per-process TTL + LRU cache of serialized JSON bodies.
+
+    Every entry remembers the table_versions of the tables (tags) it was built from. Those
+    versions are bumped by triggers in the writing transaction, whichever process wrote, so
+    they act as the shared generation counter: an entry whose versions no longer match is
+    a miss in every worker. invalidate() additionally drops the local entries right away.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str, Tuple[str, ...], bytes, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, entry_version, _, body, headers = entry
+            if entry_version != version or expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body, headers
+
+    def set(self, key: str, version: str, tags: Tuple[str, ...], body: bytes, headers: Dict[str, str]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, version, tags, body, headers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every local entry built from one of the given tables"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if set(entry[2]) & set(tags)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache(settings.response_cache_size, settings.response_cache_ttl)
+
+def _cache_key(request: Request) -> str:
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+async def cached_response(
+    request: Request,
+    db: AsyncSession,
+    tags: Iterable[str],
+    build: Callable[[], Awaitable[Any]],
+    headers: Optional[Callable[[], Dict[str, str]]] = None
+) -> Response:
+    """
+    Serve a read-mostly endpoint from response_cache, keyed by path + query string.
+
+    A hit costs one table_versions lookup and sends the cached bytes without running the
+    endpoint's queries or its serialization; If-None-Match is answered with 304 either way.
+    On a miss build() is awaited (it should return response-model instances or plain data)
+    and headers(), if given, supplies extra headers to store with the body.
+    """
+    tags = tuple(tags)
+    version = await get_table_version(db, tags)
+    etag = make_etag(request, version)
+    response_headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=response_headers)
+
+    key = _cache_key(request)
+    cached = response_cache.get(key, version)
+    if cached is None:
+        body = JSONResponse(content=jsonable_encoder(await build())).body
+        extra_headers = headers() if headers else {}
+        response_cache.set(key, version, tags, body, extra_headers)
+    else:
+        body, extra_headers = cached
+    return Response(content=body, media_type="application/json", headers={**response_headers, **extra_headers})
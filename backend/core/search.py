@@ -0,0 +1,119 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Select, column, literal_column, or_, select, table, text
+from sqlalchemy.engine import Engine
+from models import Photo, Video, TimelineEvent
+
+logger = logging.getLogger(__name__)
+
+# table -> (model, indexed columns); each gets an external-content FTS5 table "<table>_fts"
+SEARCH_SOURCES: Dict[str, Tuple[type, Tuple[str, ...]]] = {
+    "photos": (Photo, ("title", "description")),
+    "videos": (Video, ("title", "description")),
+    "timeline_events": (TimelineEvent, ("title", "description", "location")),
+}
+
+# The trigram tokenizer indexes every 3-character window, so Chinese text (which has no
+# word separators) is searchable by substring. Terms shorter than this cannot use the index.
+MIN_TERM_LENGTH = 3
+
+# Set by install_search_index(); False on non-SQLite databases or SQLite builds without FTS5 trigram
+fts_enabled = False
+
+def install_search_index(engine: Engine) -> None:
+    """
+    Create the FTS5 tables and the triggers keeping them in sync with their source tables.
+
+    Triggers run inside the writing transaction, so the index is updated by ORM writes and
+    bulk statements alike. A newly created index is filled once from the existing rows.
+    """
+    global fts_enabled
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        for name, (_, columns) in SEARCH_SOURCES.items():
+            fts = f"{name}_fts"
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": fts}
+            ).first() is not None
+            try:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                    f"{', '.join(columns)}, content='{name}', content_rowid='id', tokenize='trigram')"
+                ))
+            except Exception as e:
+                logger.warning("FTS5 trigram search unavailable, falling back to LIKE: %s", e)
+                return
+
+            new_values = ", ".join(f"new.{c}" for c in columns)
+            old_values = ", ".join(f"old.{c}" for c in columns)
+            delete_row = (
+                f"INSERT INTO {fts}({fts}, rowid, {', '.join(columns)}) "
+                f"VALUES ('delete', old.id, {old_values});"
+            )
+            insert_row = f"INSERT INTO {fts}(rowid, {', '.join(columns)}) VALUES (new.id, {new_values});"
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {name} BEGIN {insert_row} END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {name} BEGIN {delete_row} END"
+            ))
+            # 只在被索引的列变化时更新索引
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {', '.join(columns)} ON {name} "
+                f"BEGIN {delete_row} {insert_row} END"
+            ))
+            if not existed:
+                conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+    fts_enabled = True
+
+def _split_terms(search: str) -> Tuple[List[str], List[str]]:
+    """(terms long enough for the trigram index, shorter terms)"""
+    terms = search.split()
+    return (
+        [term for term in terms if len(term) >= MIN_TERM_LENGTH],
+        [term for term in terms if len(term) < MIN_TERM_LENGTH],
+    )
+
+def _match_expression(terms: List[str]) -> str:
+    # 每个词作为 FTS5 字符串常量（双引号转义），词之间为 AND
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def ranked_matches(name: str, terms: List[str]):
+    """Subquery of (id, rank) for rows matching every term, best match first (lower bm25 is better)"""
+    fts = f"{name}_fts"
+    fts_table = table(fts, column("rowid"))
+    return (
+        select(fts_table.c.rowid.label("id"), literal_column(f"bm25({fts})").label("rank"))
+        .where(literal_column(fts).op("MATCH")(_match_expression(terms)))
+        .subquery()
+    )
+
+def apply_search(query: Select, name: str, search: Optional[str], ranked: bool = True) -> Select:
+    """
+    Filter a select() of SEARCH_SOURCES[name] by a search string.
+
+    Every whitespace-separated term must appear in one of the indexed columns. Terms of
+    three or more characters go through the FTS5 index and, with ranked=True, results are
+    ordered by relevance; shorter terms (e.g. two-character Chinese words) and databases
+    without FTS5 use a LIKE filter on the source columns.
+    """
+    if not search or not search.strip():
+        return query
+
+    model, columns = SEARCH_SOURCES[name]
+    indexed, short = _split_terms(search)
+    if not fts_enabled:
+        indexed, short = [], indexed + short
+
+    if indexed:
+        matches = ranked_matches(name, indexed)
+        query = query.join(matches, matches.c.id == model.id)
+        if ranked:
+            query = query.order_by(matches.c.rank)
+    for term in short:
+        query = query.where(or_(*(getattr(model, c).contains(term) for c in columns)))
+    return query
@@ -0,0 +1,44 @@
+import logging
+import multiprocessing
+import os
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# State shared by all gunicorn workers (hero deck position, rate limiter table, event ring) lives
+# in anonymous shared memory, which a worker only shares if it inherits it through fork. With
+# preload_app = True the app is imported in the gunicorn master, so everything allocated at
+# import time exists before the workers fork. Without preloading every worker allocates its own
+# copy: the hero rotation, rate limits and SSE events then silently become per-worker.
+#
+# gunicorn.conf.py records the master pid in this variable (on_starting), so an allocation in
+# any other process means the app was imported after fork.
+MASTER_PID_ENV = "GUNICORN_MASTER_PID"
+
+_warned = False
+
+def _check_before_fork(name: str) -> None:
+    global _warned
+    master_pid = os.environ.get(MASTER_PID_ENV)
+    if master_pid and master_pid != str(os.getpid()) and not _warned:
+        _warned = True
+        logger.warning(
+            "Shared memory (%s, ...) allocated in worker %s after fork, preload_app is off: "
+            "hero rotation, rate limits and SSE events are not shared between workers",
+            name, os.getpid()
+        )
+
+def shared_value(name: str, typecode: str, value: Any = 0):
+    """multiprocessing.RawValue shared by all workers forked after this call"""
+    _check_before_fork(name)
+    return multiprocessing.RawValue(typecode, value)
+
+def shared_array(name: str, typecode: str, size: int):
+    """Zero-filled multiprocessing.RawArray shared by all workers forked after this call"""
+    _check_before_fork(name)
+    return multiprocessing.RawArray(typecode, size)
+
+def shared_lock(name: str):
+    """multiprocessing.Lock usable across all workers forked after this call"""
+    _check_before_fork(name)
+    return multiprocessing.Lock()
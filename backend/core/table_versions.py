@@ -0,0 +1,43 @@
+from typing import Iterable
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import TableVersion
+
+# Tables whose writes are tracked for ETags / cache invalidation
+TRACKED_TABLES = (
+    "photos", "videos", "video_transcodes", "video_previews",
+    "timeline_events", "messages", "message_likes", "banned_words"
+)
+
+def install_version_triggers(engine: Engine) -> None:
+    """
+    Create one table_versions row and AFTER INSERT/UPDATE/DELETE triggers per tracked table.
+
+    Triggers run inside the writing transaction, so the version changes exactly when the
+    data does, for ORM writes and bulk statements alike, in every worker process.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    with engine.begin() as conn:
+        for table in TRACKED_TABLES:
+            conn.execute(
+                text("INSERT OR IGNORE INTO table_versions (name, version) VALUES (:name, 0)"),
+                {"name": table}
+            )
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} "
+                    f"AFTER {event} ON {table} BEGIN "
+                    f"UPDATE table_versions SET version = version + 1 WHERE name = '{table}'; "
+                    f"END"
+                ))
+
+async def get_table_version(db: AsyncSession, tables: Iterable[str]) -> str:
+    """Combined version string of the given tables, e.g. "12.3" for photos + videos"""
+    tables = list(tables)
+    rows = dict((await db.execute(
+        select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tables))
+    )).all())
+    return ".".join(str(rows.get(table, 0)) for table in tables)
@@ -0,0 +1,200 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .database import settings
+
+# Directories under media_root that get responsive derivatives by default
+THUMBNAIL_SOURCE_DIRS = ('wall-pic', 'weibo', 'pic')
+
+SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+def thumbnail_root() -> str:
+    return os.path.join(settings.media_root, settings.thumbnail_dir)
+
+def thumbnail_path(subdir: str, width: int, filename: str, fmt: str) -> str:
+    """Cache path of one derivative: <media_root>/thumbs/<subdir>/<width>/<filename>.<fmt>"""
+    return os.path.join(thumbnail_root(), subdir, str(width), f"{filename}.{fmt}")
+
+def thumbnail_url(subdir: str, width: int, filename: str, fmt: str) -> str:
+    return f"{settings.media_url}{settings.thumbnail_dir}/{subdir}/{width}/{filename}.{fmt}"
+
+def variant_lookup(subdir: str) -> Callable[[str], Optional[dict]]:
+    """
+    Build a filename -> {"thumbnail", "srcset"} lookup for one source directory.
+
+    Lists each width directory once, so the media index can attach srcset data to
+    every entry during a scan without one stat() per file and width.
+    """
+    existing: Dict[Tuple[int, str], set] = {}
+    for width in settings.thumbnail_widths:
+        width_dir = os.path.join(thumbnail_root(), subdir, str(width))
+        try:
+            names = set(os.listdir(width_dir))
+        except FileNotFoundError:
+            names = set()
+        for fmt in settings.thumbnail_formats:
+            existing[(width, fmt)] = names
+
+    def lookup(filename: str) -> Optional[dict]:
+        srcset = {}
+        for fmt in settings.thumbnail_formats:
+            widths = [
+                width for width in settings.thumbnail_widths
+                if f"{filename}.{fmt}" in existing[(width, fmt)]
+            ]
+            if widths:
+                srcset[fmt] = ", ".join(
+                    f"{thumbnail_url(subdir, width, filename, fmt)} {width}w" for width in widths
+                )
+        if not srcset:
+            return None
+
+        smallest = min(settings.thumbnail_widths)
+        fmt = next(iter(srcset))
+        return {
+            "thumbnail": thumbnail_url(subdir, smallest, filename, fmt),
+            "srcset": srcset
+        }
+
+    return lookup
+
+def generate_thumbnails(
+    source: str,
+    subdir: str,
+    filename: str,
+    widths: List[int],
+    formats: List[str],
+    force: bool = False
+) -> str:
+    """
+    Generate every width/format derivative of one source image.
+
+    Derivatives get the source mtime copied onto them; a derivative whose mtime
+    already matches the source is skipped. Returns "generated", "skipped" or "failed".
+    Runs inside worker processes, so it only takes picklable arguments.
+    """
+    from PIL import Image, ImageOps
+
+    source_mtime = os.stat(source).st_mtime
+    pending = [
+        (width, fmt, thumbnail_path(subdir, width, filename, fmt))
+        for width in widths
+        for fmt in formats
+    ]
+    if not force:
+        pending = [
+            item for item in pending
+            if not os.path.exists(item[2]) or os.stat(item[2]).st_mtime != source_mtime
+        ]
+    if not pending:
+        return "skipped"
+
+    pending_keys = {(width, fmt) for width, fmt, _ in pending}
+    smallest = min(widths)
+    written = 0
+    try:
+        with Image.open(source) as source_image:
+            # 不放大：比原图更宽的档位不生成（最小一档除外），srcset 中的宽度保持真实
+            pending_keys = {
+                (width, fmt) for width, fmt in pending_keys
+                if width == smallest or width <= max(source_image.size)
+            }
+            if not pending_keys:
+                return "skipped"
+
+            # JPEG 可以直接按较小尺寸解码，省去大部分解码开销
+            largest = max(width for width, _ in pending_keys)
+            source_image.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(source_image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+            # 从大到小依次缩放，每一档都基于上一档结果
+            for width in sorted({width for width, _ in pending_keys}, reverse=True):
+                target_width = min(width, image.width)
+                if target_width != image.width:
+                    target_height = max(1, round(image.height * target_width / image.width))
+                    image = image.resize((target_width, target_height), Image.LANCZOS)
+
+                for fmt in formats:
+                    if (width, fmt) not in pending_keys:
+                        continue
+                    path = thumbnail_path(subdir, width, filename, fmt)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    output = image.convert("RGB") if fmt == "jpg" and image.mode != "RGB" else image
+                    temp_path = f"{path}.tmp"
+                    output.save(temp_path, **SAVE_OPTIONS[fmt])
+                    os.utime(temp_path, (source_mtime, source_mtime))
+                    os.replace(temp_path, path)
+                    written += 1
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return "failed"
+
+    return "generated" if written else "skipped"
+
+def prune_thumbnails(subdir: str, filenames: Iterable[str]) -> int:
+    """Delete derivatives whose source image no longer exists. Returns the number removed."""
+    keep = set(filenames)
+    removed = 0
+    subdir_root = os.path.join(thumbnail_root(), subdir)
+    if not os.path.isdir(subdir_root):
+        return 0
+
+    for width_dir in os.listdir(subdir_root):
+        width_path = os.path.join(subdir_root, width_dir)
+        if not os.path.isdir(width_path):
+            continue
+        for name in os.listdir(width_path):
+            source_name, _ = os.path.splitext(name)
+            if source_name not in keep:
+                os.remove(os.path.join(width_path, name))
+                removed += 1
+    return removed
+
+def build_thumbnails(
+    subdirs: Iterable[str] = THUMBNAIL_SOURCE_DIRS,
+    workers: Optional[int] = None,
+    force: bool = False,
+    prune: bool = True
+) -> Dict[str, Dict[str, int]]:
+    """
+    Generate derivatives for every image in the given media sub-directories using a process pool.
+
+    Safe to re-run: unchanged sources are skipped. When anything changed in a directory its
+    mtime is bumped, so the per-process media indexes rescan and pick up the new srcset data.
+    """
+    from .media_index import IMAGE_EXTENSIONS
+
+    widths = list(settings.thumbnail_widths)
+    formats = list(settings.thumbnail_formats)
+    report = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for subdir in subdirs:
+            source_dir = os.path.join(settings.media_root, subdir)
+            if not os.path.isdir(source_dir):
+                continue
+
+            filenames = [f for f in os.listdir(source_dir) if f.lower().endswith(IMAGE_EXTENSIONS)]
+            futures = [
+                executor.submit(
+                    generate_thumbnails,
+                    os.path.join(source_dir, filename), subdir, filename, widths, formats, force
+                )
+                for filename in filenames
+            ]
+
+            counts = {"generated": 0, "skipped": 0, "failed": 0, "pruned": 0}
+            for future in futures:
+                counts[future.result()] += 1
+            if prune:
+                counts["pruned"] = prune_thumbnails(subdir, filenames)
+
+            if counts["generated"] or counts["pruned"]:
+                os.utime(source_dir)
+            report[subdir] = counts
+
+    return report
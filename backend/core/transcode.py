@@ -0,0 +1,262 @@
+import datetime
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from .database import settings, SessionLocal
+from .media_serving import media_relative_path
+from models import Video, VideoTranscode
+
+logger = logging.getLogger(__name__)
+
+# (name, height, video bitrate, max rate, audio bitrate); renditions taller than the source are skipped
+HLS_LADDER = [
+    ("360p", 360, "800k", "856k", "96k"),
+    ("720p", 720, "2800k", "2996k", "128k"),
+    ("1080p", 1080, "5000k", "5350k", "192k"),
+]
+
+# Transcoding runs at the lowest CPU priority so it never competes with the API workers
+NICENESS = 19
+
+def niced(command: List[str]) -> List[str]:
+    """Run command under nice(1); a preexec_fn calling os.nice is unsafe from worker threads"""
+    return ["nice", "-n", str(NICENESS)] + command
+
+def local_video_path(video: Video) -> Optional[str]:
+    """Absolute path of the video's local file, or None for embed-only videos / missing files"""
+    if not video.file_path:
+        return None
+    path = os.path.join(settings.media_root, media_relative_path(video.file_path))
+    return path if os.path.isfile(path) else None
+
+def hls_output_dir(video_id: int) -> str:
+    return os.path.join(settings.media_root, settings.hls_dir, str(video_id))
+
+def hls_playlist_url(video_id: int) -> str:
+    return f"{settings.media_url}{settings.hls_dir}/{video_id}/master.m3u8"
+
+def probe_video(path: str) -> dict:
+    """width, height, duration (seconds) and has_audio of a video file, via ffprobe"""
+    result = subprocess.run(
+        [settings.ffprobe_binary, "-v", "error", "-print_format", "json", "-show_streams", "-show_format", path],
+        capture_output=True, check=True, text=True
+    )
+    probe = json.loads(result.stdout)
+    streams = probe.get("streams", [])
+    video_streams = [stream for stream in streams if stream.get("codec_type") == "video"]
+    video_stream = max(video_streams, key=lambda stream: int(stream.get("height") or 0), default={})
+    return {
+        "width": int(video_stream.get("width") or 0),
+        "height": int(video_stream.get("height") or 0),
+        "duration": float(probe.get("format", {}).get("duration") or 0),
+        "has_audio": any(stream.get("codec_type") == "audio" for stream in streams),
+    }
+
+def build_hls_command(source: str, output_dir: str, height: int, has_audio: bool) -> Tuple[List[str], List[str]]:
+    """ffmpeg arguments producing every rendition plus master.m3u8 in one pass, and the rendition names"""
+    ladder = [rung for rung in HLS_LADDER if rung[1] <= height] or HLS_LADDER[:1]
+
+    split = f"[0:v]split={len(ladder)}" + "".join(f"[v{i}]" for i in range(len(ladder)))
+    scales = [f"[v{i}]scale=-2:{rung[1]}[v{i}out]" for i, rung in enumerate(ladder)]
+    command = [
+        settings.ffmpeg_binary, "-hide_banner", "-loglevel", "error", "-y",
+        "-i", source,
+        "-threads", str(settings.transcode_threads),
+        "-filter_complex", ";".join([split] + scales),
+        # 按时间强制关键帧，保证各码率的分片边界对齐（与帧率无关）
+        "-force_key_frames", f"expr:gte(t,n_forced*{settings.hls_segment_seconds})",
+        "-sc_threshold", "0",
+    ]
+
+    stream_map = []
+    for i, (name, _, bitrate, maxrate, audio_bitrate) in enumerate(ladder):
+        command += [
+            "-map", f"[v{i}out]",
+            f"-c:v:{i}", "libx264", "-preset", "veryfast", "-profile:v", "main",
+            f"-b:v:{i}", bitrate, f"-maxrate:v:{i}", maxrate, f"-bufsize:v:{i}", maxrate,
+        ]
+        if has_audio:
+            command += ["-map", "a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", audio_bitrate, "-ac", "2"]
+            stream_map.append(f"v:{i},a:{i},name:{name}")
+        else:
+            stream_map.append(f"v:{i},name:{name}")
+
+    command += [
+        "-f", "hls",
+        "-hls_time", str(settings.hls_segment_seconds),
+        "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", os.path.join(output_dir, "%v", "seg_%05d.ts"),
+        "-master_pl_name", "master.m3u8",
+        "-var_stream_map", " ".join(stream_map),
+        os.path.join(output_dir, "%v", "index.m3u8"),
+    ]
+    return command, [rung[0] for rung in ladder]
+
+def transcode_to_hls(video_id: int, source: str) -> List[str]:
+    """Transcode one file into <media_root>/hls/<video_id>/. Returns the rendition names."""
+    output_dir = hls_output_dir(video_id)
+    os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+    # 每次运行独立的临时目录：重新排队的任务可能与仍在运行的旧任务并行
+    temp_dir = tempfile.mkdtemp(prefix=f"{video_id}.tmp-", dir=os.path.dirname(output_dir))
+    try:
+        probe = probe_video(source)
+        command, renditions = build_hls_command(source, temp_dir, probe["height"], probe["has_audio"])
+        subprocess.run(niced(command), check=True, capture_output=True, text=True)
+
+        # 整个目录生成完成后再替换，播放中的客户端不会读到半成品
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(temp_dir, output_dir)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return renditions
+
+def remove_hls_output(video_id: int) -> None:
+    shutil.rmtree(hls_output_dir(video_id), ignore_errors=True)
+
+def queue_transcode(db: Session, video: Video) -> None:
+    """Mark a video for (re)transcoding. Embed-only videos drop any previous job."""
+    if not video.file_path:
+        if video.transcode is not None:
+            video.transcode = None
+            db.commit()
+        return
+
+    if video.transcode is None:
+        video.transcode = VideoTranscode(status="pending")
+    else:
+        video.transcode.status = "pending"
+        video.transcode.error = ""
+    db.commit()
+
+def reclaim_stale_transcodes(db: Session) -> int:
+    """
+    Re-queue jobs stuck in processing for longer than transcode_stale_after seconds, i.e. whose
+    runner was killed mid-job. Returns the number re-queued.
+    """
+    cutoff = datetime.datetime.now() - datetime.timedelta(seconds=settings.transcode_stale_after)
+    reclaimed = db.query(VideoTranscode).filter(
+        VideoTranscode.status == "processing",
+        (VideoTranscode.started_at == None) | (VideoTranscode.started_at < cutoff)  # noqa: E711
+    ).update({"status": "pending", "error": ""}, synchronize_session=False)
+    db.commit()
+    if reclaimed:
+        logger.warning("Re-queued %s stale transcode job(s)", reclaimed)
+    return reclaimed
+
+def queue_missing_transcodes(db: Session, force: bool = False) -> int:
+    """Queue every local video without up-to-date renditions. Returns the number queued."""
+    reclaim_stale_transcodes(db)
+    queued = 0
+    for video in db.query(Video).filter(Video.file_path != "").all():
+        source = local_video_path(video)
+        if source is None:
+            continue
+        job = video.transcode
+        if job is not None and job.status in ("pending", "processing"):
+            continue
+        if not force and job is not None and job.status in ("ready", "failed") \
+                and job.source_mtime == os.stat(source).st_mtime:
+            continue
+
+        if job is None:
+            video.transcode = VideoTranscode(status="pending")
+        else:
+            job.status = "pending"
+            job.error = ""
+        queued += 1
+    db.commit()
+    return queued
+
+def _claim(db: Session, video_id: int) -> Optional[datetime.datetime]:
+    """
+    Atomically move a pending job to processing, so parallel runners never share a job.
+    Returns the claim's started_at, which identifies this run, or None if not claimed.
+    """
+    started_at = datetime.datetime.now()
+    claimed = db.query(VideoTranscode).filter(
+        VideoTranscode.video_id == video_id,
+        VideoTranscode.status == "pending"
+    ).update(
+        {"status": "processing", "started_at": started_at, "error": ""},
+        synchronize_session=False
+    )
+    db.commit()
+    return started_at if claimed == 1 else None
+
+def _finish(db: Session, video_id: int, started_at: datetime.datetime, values: dict) -> bool:
+    """Store the outcome of a run, unless the job was re-queued or reclaimed in the meantime"""
+    finished = db.query(VideoTranscode).filter(
+        VideoTranscode.video_id == video_id,
+        VideoTranscode.status == "processing",
+        VideoTranscode.started_at == started_at
+    ).update(
+        {**values, "finished_at": datetime.datetime.now()},
+        synchronize_session=False
+    )
+    db.commit()
+    return finished == 1
+
+def _run_job(video_id: int) -> str:
+    db = SessionLocal()
+    try:
+        started_at = _claim(db, video_id)
+        if started_at is None:
+            return "skipped"
+
+        video = db.query(Video).filter(Video.id == video_id).first()
+        source = local_video_path(video) if video else None
+        if source is None:
+            _finish(db, video_id, started_at, {"status": "failed", "error": "Local video file not found"})
+            return "failed"
+
+        source_mtime = os.stat(source).st_mtime
+        # 转码耗时较长，期间不占用数据库连接
+        db.close()
+        try:
+            renditions = transcode_to_hls(video_id, source)
+            values = {
+                "status": "ready",
+                "playlist": hls_playlist_url(video_id),
+                "renditions": ",".join(renditions),
+                "error": "",
+            }
+        except Exception as e:
+            stderr = getattr(e, "stderr", "") or ""
+            values = {"status": "failed", "error": (stderr or str(e))[-2000:]}
+            logger.warning("HLS transcode of video %s failed: %s", video_id, values["error"])
+
+        values["source_mtime"] = source_mtime
+        db = SessionLocal()
+        if not _finish(db, video_id, started_at, values):
+            # 转码期间视频被重新排队：结果作废，新任务会再转一次
+            logger.info("Transcode job of video %s was re-queued while running, result discarded", video_id)
+            return "skipped"
+        return values["status"]
+    finally:
+        db.close()
+
+def run_pending_transcodes(workers: Optional[int] = None) -> dict:
+    """Process every pending job with at most `workers` concurrent ffmpeg processes"""
+    workers = workers or settings.transcode_workers
+    db = SessionLocal()
+    try:
+        reclaim_stale_transcodes(db)
+        video_ids = [
+            video_id for (video_id,) in
+            db.query(VideoTranscode.video_id).filter(VideoTranscode.status == "pending").all()
+        ]
+    finally:
+        db.close()
+
+    counts = {"ready": 0, "failed": 0, "skipped": 0}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for status in executor.map(_run_job, video_ids):
+            counts[status] += 1
+    return counts
@@ -0,0 +1,169 @@
+import logging
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+from sqlalchemy import bindparam, delete, insert, update
+from .database import settings, SessionLocal
+from .transcode import local_video_path, niced, probe_video
+from models import Video, VideoPreview
+
+logger = logging.getLogger(__name__)
+
+POSTER_WIDTH = 640
+SPRITE_FRAME_WIDTH = 160
+SPRITE_COLUMNS = 10
+SPRITE_MAX_FRAMES = 100  # 10x10 grid
+SPRITE_MIN_INTERVAL = 1.0  # seconds between sprite frames
+
+def preview_dir(video_id: int) -> str:
+    return os.path.join(settings.media_root, settings.video_thumbnail_dir, str(video_id))
+
+def preview_url(video_id: int, name: str) -> str:
+    return f"{settings.media_url}{settings.video_thumbnail_dir}/{video_id}/{name}"
+
+def _run_ffmpeg(arguments: List[str]) -> None:
+    subprocess.run(
+        niced([settings.ffmpeg_binary, "-hide_banner", "-loglevel", "error", "-y"] + arguments),
+        check=True,
+        capture_output=True,
+        text=True
+    )
+
+def _vtt_timestamp(seconds: float) -> str:
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+def build_sprite_vtt(sprite_url: str, frames: int, interval: float, duration: float,
+                     frame_width: int, frame_height: int) -> str:
+    """WebVTT thumbnails track: one cue per sprite tile, pointing at it with #xywh"""
+    lines = ["WEBVTT", ""]
+    for frame in range(frames):
+        start = frame * interval
+        end = min(duration, start + interval) if duration else start + interval
+        x = (frame % SPRITE_COLUMNS) * frame_width
+        y = (frame // SPRITE_COLUMNS) * frame_height
+        lines.append(f"{_vtt_timestamp(start)} --> {_vtt_timestamp(end)}")
+        lines.append(f"{sprite_url}#xywh={x},{y},{frame_width},{frame_height}")
+        lines.append("")
+    return "\n".join(lines)
+
+def extract_previews(video_id: int, source: str) -> dict:
+    """
+    Write poster.jpg, sprite.jpg and sprite.vtt for one video into media/video_thumbnails/<id>/.
+    Returns the VideoPreview column values.
+    """
+    probe = probe_video(source)
+    duration = probe["duration"]
+    output_dir = preview_dir(video_id)
+    temp_dir = f"{output_dir}.tmp"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+
+    # 封面取 10% 处的画面，避开片头黑屏
+    _run_ffmpeg([
+        "-ss", f"{duration * 0.1:.3f}", "-i", source,
+        "-frames:v", "1", "-vf", f"scale={POSTER_WIDTH}:-2", "-q:v", "3",
+        os.path.join(temp_dir, "poster.jpg"),
+    ])
+
+    interval = max(SPRITE_MIN_INTERVAL, duration / SPRITE_MAX_FRAMES) if duration else SPRITE_MIN_INTERVAL
+    frames = min(SPRITE_MAX_FRAMES, max(1, int(duration // interval))) if duration else 1
+    rows = (frames + SPRITE_COLUMNS - 1) // SPRITE_COLUMNS
+    frame_height = round(SPRITE_FRAME_WIDTH * probe["height"] / probe["width"] / 2) * 2 if probe["width"] else 90
+    _run_ffmpeg([
+        "-i", source,
+        "-vf", f"fps=1/{interval:.3f},scale={SPRITE_FRAME_WIDTH}:{frame_height},tile={SPRITE_COLUMNS}x{rows}",
+        "-frames:v", "1", "-q:v", "5",
+        os.path.join(temp_dir, "sprite.jpg"),
+    ])
+
+    sprite_url = preview_url(video_id, "sprite.jpg")
+    with open(os.path.join(temp_dir, "sprite.vtt"), "w", encoding="utf-8") as vtt_file:
+        vtt_file.write(build_sprite_vtt(sprite_url, frames, interval, duration, SPRITE_FRAME_WIDTH, frame_height))
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(temp_dir, output_dir)
+    return {
+        "video_id": video_id,
+        "poster": preview_url(video_id, "poster.jpg"),
+        "sprite": sprite_url,
+        "sprite_vtt": preview_url(video_id, "sprite.vtt"),
+    }
+
+def _extract_job(job: tuple) -> Optional[dict]:
+    video_id, source, source_mtime = job
+    try:
+        values = extract_previews(video_id, source)
+    except Exception as e:
+        logger.warning("Preview extraction for video %s failed: %s", video_id, getattr(e, "stderr", "") or e)
+        return None
+    values["source_mtime"] = source_mtime
+    return values
+
+def generate_video_previews(
+    video_ids: Optional[Iterable[int]] = None,
+    workers: Optional[int] = None,
+    force: bool = False
+) -> dict:
+    """
+    Extract posters and sprite sheets for local videos in a worker pool, then write all paths
+    back in one transaction. Videos whose previews were built from the current source mtime
+    are skipped unless force is set. An existing non-empty Video.thumbnail is kept.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Video).filter(Video.file_path != "")
+        if video_ids is not None:
+            query = query.filter(Video.id.in_(list(video_ids)))
+
+        jobs = []
+        skipped = 0
+        for video in query.all():
+            source = local_video_path(video)
+            if source is None:
+                continue
+            source_mtime = os.stat(source).st_mtime
+            if not force and video.preview is not None and video.preview.source_mtime == source_mtime \
+                    and video.thumbnail:
+                skipped += 1
+                continue
+            jobs.append((video.id, source, source_mtime))
+    finally:
+        db.close()
+
+    # ffmpeg 在子进程中运行，线程池只负责等待，并发数即 ffmpeg 进程数
+    with ThreadPoolExecutor(max_workers=workers or settings.preview_workers) as executor:
+        results = [values for values in executor.map(_extract_job, jobs) if values]
+
+    if results:
+        db = SessionLocal()
+        try:
+            video_ids = [values["video_id"] for values in results]
+            db.execute(delete(VideoPreview).where(VideoPreview.video_id.in_(video_ids)))
+            db.execute(insert(VideoPreview), results)
+            # 只填充空的 thumbnail，不覆盖手动设置的封面
+            videos = Video.__table__
+            db.execute(
+                update(videos)
+                .where(videos.c.id == bindparam("b_video_id"), videos.c.thumbnail == "")
+                .values(thumbnail=bindparam("b_poster")),
+                [{"b_video_id": values["video_id"], "b_poster": values["poster"]} for values in results]
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    return {"generated": len(results), "failed": len(jobs) - len(results), "skipped": skipped}
+
+def remove_video_previews(video_id: int) -> None:
+    shutil.rmtree(preview_dir(video_id), ignore_errors=True)
+
+# On-create hook: one extraction at a time per API worker, outside the request threadpool
+_hook_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="video-previews")
+
+def schedule_video_previews(video_id: int, force: bool = False) -> None:
+    """Extract previews for a newly created/changed video in the background"""
+    _hook_executor.submit(generate_video_previews, [video_id], 1, force)
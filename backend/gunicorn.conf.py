@@ -1,6 +1,7 @@
 # Gunicorn configuration for ZhaoLuSi FastAPI application
 
 import multiprocessing
+import os
 
 # Server socket
 bind = "unix:/run/gunicorn/zhaolusi.sock"
@@ -18,6 +19,17 @@ preload_app = True
 timeout = 120
 keepalive = 2
 
+def on_starting(server):
+    # core.shared_memory 据此检查共享内存是否在 fork 之前分配
+    os.environ["GUNICORN_MASTER_PID"] = str(os.getpid())
+
+def post_fork(server, worker):
+    # preload_app 时主进程已打开数据库连接，fork 后各 worker 必须使用自己的连接
+    from core.database import async_engine, engine, writer_engine
+    engine.dispose(close=False)
+    writer_engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
 # Restart workers after this many requests, to help prevent memory leaks
 max_requests = 1000
 max_requests_jitter = 100
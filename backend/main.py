@@ -1,16 +1,26 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
 import os
-import random
-from core.database import engine
+from typing import Optional
+from core.counters import install_counters
+from core.database import async_engine, engine, settings
+from core.media_serving import media_file_response
+from core.migrations import run_migrations
+from core.search import install_search_index
+from core.table_versions import install_version_triggers
 from models import Base
-from routers import gallery_router, timeline_router
+from routers import gallery_router, timeline_router, search_router
 from routers.messages import router as messages_router
+from routers.gallery import get_random_hero_image
+from schemas import RandomHeroResponse
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+install_version_triggers(engine)
+install_search_index(engine)
+install_counters(engine)
 
 app = FastAPI(
     title="ZhaoLuSi Personal Website API",
@@ -25,19 +35,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Mount static files for media
-media_directory = os.path.abspath("../media")
+# Media files: in "accel" mode nginx sends the bytes (X-Accel-Redirect), Python only resolves the path
+media_directory = settings.media_root
 if not os.path.exists(media_directory):
     os.makedirs(media_directory)
-    
-app.mount("/media", StaticFiles(directory=media_directory), name="media")
+
+if settings.media_serving == "accel":
+    @app.get("/media/{file_path:path}", include_in_schema=False)
+    def serve_media(file_path: str, v: Optional[str] = None, if_none_match: Optional[str] = Header(None)):
+        return media_file_response(file_path, version=v, if_none_match=if_none_match)
+else:
+    app.mount("/media", StaticFiles(directory=media_directory), name="media")
 
 # Include routers
 app.include_router(gallery_router, prefix="/api/gallery", tags=["gallery"])
 app.include_router(timeline_router, prefix="/api/timeline", tags=["timeline"])
 app.include_router(messages_router, prefix="/api", tags=["messages"])
+app.include_router(search_router, prefix="/api", tags=["search"])
+
+@app.on_event("shutdown")
+async def close_async_connections():
+    # aiosqlite 为每个连接开一个非守护线程，不关闭连接 worker 无法退出
+    await async_engine.dispose()
 
 @app.get("/")
 def read_root():
@@ -47,38 +69,14 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
-@app.get("/api/random-hero-image")
-def get_random_hero_image():
-    """Get a random image from media/pic directory for hero section"""
-    pic_dir = "/home/ubuntu/zhaolusi-web/media/pic"
-    
-    if not os.path.exists(pic_dir):
-        return JSONResponse(
-            status_code=404,
-            content={"error": "Pictures directory not found"}
-        )
-    
-    # Get all image files from pic directory
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
-    image_files = [
-        f for f in os.listdir(pic_dir)
-        if os.path.splitext(f.lower())[1] in image_extensions
-    ]
-    
-    if not image_files:
-        return JSONResponse(
-            status_code=404,
-            content={"error": "No images found in pictures directory"}
-        )
-    
-    # Select a random image
-    random_image = random.choice(image_files)
-    image_url = f"/media/pic/{random_image}"
-    
-    return {
-        "image_url": image_url,
-        "filename": random_image
-    }
+# Legacy hero path used by the frontend, served by the same hero deck as /api/gallery/random-hero
+app.add_api_route(
+    "/api/random-hero-image",
+    get_random_hero_image,
+    methods=["GET"],
+    response_model=RandomHeroResponse,
+    tags=["gallery"]
+)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,34 +1,125 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Date, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Date, Float, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
+from typing import Optional
+from core.media_serving import versioned_media_url, versioned_url
 
 Base = declarative_base()
 
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value is not None else None
+
 class Photo(Base):
     __tablename__ = "photos"
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
-    file_path = Column(String(500), nullable=False)  # Store file path as string
+    file_path = Column(String(500), nullable=False, index=True)  # Store file path as string
     category = Column(String(20), default="life")
     description = Column(Text, default="")
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("ix_photos_created_at_id", "created_at", "id"),
+        Index("ix_photos_category_created_at_id", "category", "created_at", "id"),
+    )
+    
+    # 导入时记录的源文件 mtime，用作 URL 版本（不在请求路径上 stat 文件）
+    source = relationship("PhotoSource", uselist=False, lazy="selectin", viewonly=True)
+    
+    @property
+    def url(self):
+        """
+        Public URL of the file with ?v=<version>, cacheable forever. The version is the
+        imported source mtime, else updated_at (changing file_path bumps it).
+        """
+        if not self.file_path:
+            return None
+        mtime = self.source.mtime if self.source is not None else _timestamp(self.updated_at)
+        return versioned_media_url(self.file_path, mtime)
+
+class PhotoSource(Base):
+    __tablename__ = "photo_sources"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    photo_id = Column(Integer, ForeignKey("photos.id", ondelete="CASCADE"), nullable=False, unique=True)
+    path = Column(String(500), nullable=False, unique=True)  # Relative to media_root, e.g. wall-pic/x.jpg
+    size = Column(Integer, default=0)
+    mtime = Column(Float, nullable=False)  # Source mtime at last import
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
 class Video(Base):
     __tablename__ = "videos"
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
-    file_path = Column(String(500), default="")  # Local video file
+    file_path = Column(String(500), default="", index=True)  # Local video file
     embed_link = Column(String(500), default="")  # External video link
     category = Column(String(20), default="life")
     description = Column(Text, default="")
     thumbnail = Column(String(500), default="")  # Thumbnail image path
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("ix_videos_created_at_id", "created_at", "id"),
+        Index("ix_videos_category_created_at_id", "category", "created_at", "id"),
+    )
+    
+    transcode = relationship("VideoTranscode", uselist=False, lazy="selectin", cascade="all, delete-orphan")
+    preview = relationship("VideoPreview", uselist=False, lazy="selectin", cascade="all, delete-orphan")
+    
+    @property
+    def hls_url(self):
+        """Master playlist URL once the HLS renditions are ready"""
+        if self.transcode is not None and self.transcode.status == "ready":
+            return self.transcode.playlist
+        return None
+    
+    @property
+    def file_url(self):
+        """Local file endpoint with ?v=<version> (None for embed-only videos)"""
+        if not self.file_path:
+            return None
+        # 转码/预览任务记录的源文件 mtime，没有时用 updated_at（不在请求路径上 stat 文件）
+        mtimes = [job.source_mtime for job in (self.transcode, self.preview) if job is not None and job.source_mtime]
+        mtime = max(mtimes) if mtimes else _timestamp(self.updated_at)
+        return versioned_url(f"/api/gallery/videos/{self.id}/file", mtime)
+    
+    @property
+    def sprite_vtt_url(self):
+        """WebVTT track pointing into the scrubbing sprite sheet"""
+        if self.preview is not None and self.preview.sprite_vtt:
+            return self.preview.sprite_vtt
+        return None
+
+class VideoTranscode(Base):
+    __tablename__ = "video_transcodes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False, unique=True)
+    status = Column(String(20), default="pending")  # pending, processing, ready, failed
+    playlist = Column(String(500), default="")  # Master playlist URL, e.g. /media/hls/1/master.m3u8
+    renditions = Column(String(100), default="")  # e.g. "360p,720p"
+    source_mtime = Column(Float, nullable=True)  # Source mtime the renditions were built from
+    error = Column(Text, default="")
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class VideoPreview(Base):
+    __tablename__ = "video_previews"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False, unique=True)
+    poster = Column(String(500), default="")  # Poster frame URL
+    sprite = Column(String(500), default="")  # Sprite sheet URL
+    sprite_vtt = Column(String(500), default="")  # WebVTT with #xywh cues into the sprite
+    source_mtime = Column(Float, nullable=True)  # Source mtime the previews were built from
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
 class TimelineEvent(Base):
     __tablename__ = "timeline_events"
@@ -43,6 +134,10 @@ class TimelineEvent(Base):
     is_featured = Column(Boolean, default=False)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("ix_timeline_events_event_date_id", "event_date", "id"),
+    )
 
 class Message(Base):
     __tablename__ = "messages"
@@ -58,6 +153,12 @@ class Message(Base):
     created_at = Column(DateTime, default=func.now())
     approved_at = Column(DateTime, nullable=True)
     approved_by = Column(String(50), default="")
+    
+    __table_args__ = (
+        Index("ix_messages_status_approved_at_id", "status", "approved_at", "id"),
+        Index("ix_messages_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_messages_created_at_id", "created_at", "id"),
+    )
 
 class MessageLike(Base):
     __tablename__ = "message_likes"
@@ -66,6 +167,10 @@ class MessageLike(Base):
     message_id = Column(Integer, ForeignKey("messages.id"), nullable=False)
     ip_address = Column(String(45), nullable=False)  # 用IP限制重复点赞
     created_at = Column(DateTime, default=func.now())
+    
+    __table_args__ = (
+        Index("ux_message_likes_message_id_ip_address", "message_id", "ip_address", unique=True),
+    )
 
 class BannedWord(Base):
     __tablename__ = "banned_words"
@@ -73,4 +178,39 @@ class BannedWord(Base):
     id = Column(Integer, primary_key=True, index=True)
     word = Column(String(100), nullable=False)
     severity = Column(String(10), default="medium")  # low, medium, high
-    created_at = Column(DateTime, default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, default=func.now())
+
+class MediaMetadata(Base):
+    __tablename__ = "media_metadata"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String(500), nullable=False, unique=True)  # Relative to media_root, e.g. wall-pic/x.jpg
+    subdir = Column(String(100), nullable=False, index=True)
+    mtime = Column(Float, nullable=False)  # Source mtime when extracted
+    size = Column(Integer, default=0)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    taken_at = Column(DateTime, nullable=True)  # EXIF DateTimeOriginal
+    dominant_color = Column(String(7), default="")  # #rrggbb
+    placeholder = Column(Text, default="")  # Tiny base64 data URI (LQIP)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+    
+    version = Column(Integer, primary_key=True)  # See core/migrations.py
+    name = Column(String(200), nullable=False)
+    applied_at = Column(DateTime, default=func.now())
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    
+    name = Column(String(50), primary_key=True)  # Table name
+    version = Column(Integer, default=0, nullable=False)  # Bumped by triggers on every write
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+    
+    scope = Column(String(50), primary_key=True)  # "<table>" for totals, "<table>.<dimension>" otherwise
+    key = Column(String(100), primary_key=True)  # Dimension value ("" for totals)
+    count = Column(Integer, default=0, nullable=False)  # Maintained by triggers, see core/counters.py
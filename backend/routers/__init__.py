@@ -1,4 +1,5 @@
 from .gallery import router as gallery_router
 from .timeline import router as timeline_router
+from .search import router as search_router
 
-__all__ = ["gallery_router", "timeline_router"]
\ No newline at end of file
+__all__ = ["gallery_router", "timeline_router", "search_router"]
\ No newline at end of file
@@ -1,21 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-import os
-import random
 import re
 from datetime import datetime
-from core.database import get_db, settings
-from models import Photo, Video
+from core.bulk_write import WrittenRow, bulk_write
+from core.counters import get_counters
+from core.database import get_db, get_async_db, verify_admin_key
+from core.db_writer import db_writer
+from core.media_index import get_media_index, rescan_media_indexes, MediaDirectoryIndex, MediaSnapshot
+from core.hero import hero_deck
+from core.http_cache import conditional_response
+from core.media_serving import media_file_response, media_relative_path
+from core.pagination import paginate
+from core.search import apply_search
+from core.response_cache import cached_response, response_cache
+from core.transcode import queue_transcode, remove_hls_output
+from core.video_previews import schedule_video_previews, remove_video_previews
+from models import Photo, PhotoSource, Video, VideoTranscode
 from schemas import (
     PhotoResponse, VideoResponse, PhotoCreate, VideoCreate,
     PhotoUpdate, VideoUpdate, FeaturedContentResponse,
-    GalleryStatsResponse, RandomHeroResponse
+    GalleryStatsResponse, RandomHeroResponse, BulkWriteResponse
 )
 
 router = APIRouter()
 
+# Tables a video response is built from (hls_url / sprite_vtt_url come from the job tables)
+VIDEO_TABLES = ("videos", "video_transcodes", "video_previews")
+
 # 解析文件名中的日期信息
 def parse_filename_date(filename):
     """
@@ -37,473 +52,407 @@ def parse_filename_date(filename):
     
     return None
 
+# 解析微博文件名中的日期信息
+def parse_weibo_filename_date(filename):
+    """
+    解析微博文件名中的日期，支持格式：YYYY-MM-DD.jpg 或 YYYY-MM-DD-N.jpg
+    例如：2015-11-12.jpg -> 2015-11-12
+    """
+    try:
+        # 匹配 YYYY-MM-DD 格式
+        pattern = r'(\d{4})-(\d{2})-(\d{2})'
+        match = re.search(pattern, filename)
+        
+        if match:
+            year = int(match.group(1))
+            month = int(match.group(2))
+            day = int(match.group(3))
+            return datetime(year, month, day)
+    except ValueError:
+        pass
+    
+    return None
+
+wall_index = get_media_index('wall-pic', parse_filename_date)
+weibo_index = get_media_index('weibo', parse_weibo_filename_date)
+
 # Photo endpoints
 @router.get("/photos", response_model=List[PhotoResponse])
-def get_photos(
+async def get_photos(
+    response: Response,
     category: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Photo)
+    query = select(Photo)
     
     if category:
-        query = query.filter(Photo.category == category)
+        query = query.where(Photo.category == category)
     
+    # 搜索结果按相关度排序，只能按 offset 分页
     if search:
-        query = query.filter(Photo.title.contains(search) | Photo.description.contains(search))
+        query = apply_search(query, "photos", search)
+        query = query.order_by(Photo.created_at.desc(), Photo.id.desc()).offset(skip).limit(limit)
+        return (await db.scalars(query)).all()
     
-    photos = query.offset(skip).limit(limit).all()
-    return photos
+    return await paginate(db, query, Photo.created_at, Photo.id, response, cursor=cursor, skip=skip, limit=limit)
 
 @router.get("/photos/{photo_id}", response_model=PhotoResponse)
-def get_photo(photo_id: int, db: Session = Depends(get_db)):
-    photo = db.query(Photo).filter(Photo.id == photo_id).first()
+async def get_photo(photo_id: int, db: AsyncSession = Depends(get_async_db)):
+    photo = await db.get(Photo, photo_id)
     if not photo:
         raise HTTPException(status_code=404, detail="Photo not found")
     return photo
 
 @router.post("/photos", response_model=PhotoResponse)
-def create_photo(photo: PhotoCreate, db: Session = Depends(get_db)):
-    db_photo = Photo(**photo.dict())
-    db.add(db_photo)
-    db.commit()
-    db.refresh(db_photo)
+def create_photo(photo: PhotoCreate):
+    def write(session: Session) -> PhotoResponse:
+        db_photo = Photo(**photo.dict())
+        session.add(db_photo)
+        session.commit()
+        return PhotoResponse.model_validate(db_photo)
+    
+    db_photo = db_writer.run(write)
+    response_cache.invalidate("photos")
     return db_photo
 
+@router.post("/photos/bulk", response_model=BulkWriteResponse)
+async def bulk_create_photos(
+    request: Request,
+    upsert: bool = Query(False),
+    admin_verified: bool = Depends(verify_admin_key)
+):
+    """Create photos from a JSON array or NDJSON body; with upsert=true, items whose file_path exists update that photo"""
+    result = await bulk_write(request, PhotoCreate, Photo, upsert_on="file_path" if upsert else None)
+    response_cache.invalidate("photos")
+    return result
+
 @router.put("/photos/{photo_id}", response_model=PhotoResponse)
-def update_photo(photo_id: int, photo_update: PhotoUpdate, db: Session = Depends(get_db)):
-    db_photo = db.query(Photo).filter(Photo.id == photo_id).first()
-    if not db_photo:
-        raise HTTPException(status_code=404, detail="Photo not found")
-    
-    update_data = photo_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_photo, field, value)
+def update_photo(photo_id: int, photo_update: PhotoUpdate):
+    def write(session: Session) -> PhotoResponse:
+        db_photo = session.get(Photo, photo_id)
+        if not db_photo:
+            raise HTTPException(status_code=404, detail="Photo not found")
+        
+        update_data = photo_update.dict(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(db_photo, field, value)
+        
+        session.commit()
+        return PhotoResponse.model_validate(db_photo)
     
-    db.commit()
-    db.refresh(db_photo)
+    db_photo = db_writer.run(write)
+    response_cache.invalidate("photos")
     return db_photo
 
 @router.delete("/photos/{photo_id}")
-def delete_photo(photo_id: int, db: Session = Depends(get_db)):
-    db_photo = db.query(Photo).filter(Photo.id == photo_id).first()
-    if not db_photo:
-        raise HTTPException(status_code=404, detail="Photo not found")
+def delete_photo(photo_id: int):
+    def write(session: Session) -> None:
+        db_photo = session.get(Photo, photo_id)
+        if not db_photo:
+            raise HTTPException(status_code=404, detail="Photo not found")
+        
+        # photo_sources 的 ON DELETE CASCADE 在 SQLite 未开启外键时不生效，显式删除
+        session.execute(delete(PhotoSource).where(PhotoSource.photo_id == photo_id))
+        session.delete(db_photo)
+        session.commit()
     
-    db.delete(db_photo)
-    db.commit()
+    db_writer.run(write)
+    response_cache.invalidate("photos")
     return {"message": "Photo deleted successfully"}
 
 # Video endpoints
 @router.get("/videos", response_model=List[VideoResponse])
-def get_videos(
+async def get_videos(
+    response: Response,
     category: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(Video)
+    query = select(Video)
     
     if category:
-        query = query.filter(Video.category == category)
+        query = query.where(Video.category == category)
     
+    # 搜索结果按相关度排序，只能按 offset 分页
     if search:
-        query = query.filter(Video.title.contains(search) | Video.description.contains(search))
+        query = apply_search(query, "videos", search)
+        query = query.order_by(Video.created_at.desc(), Video.id.desc()).offset(skip).limit(limit)
+        return (await db.scalars(query)).all()
     
-    videos = query.offset(skip).limit(limit).all()
-    return videos
+    return await paginate(db, query, Video.created_at, Video.id, response, cursor=cursor, skip=skip, limit=limit)
 
 @router.get("/videos/{video_id}", response_model=VideoResponse)
-def get_video(video_id: int, db: Session = Depends(get_db)):
-    video = db.query(Video).filter(Video.id == video_id).first()
+async def get_video(video_id: int, db: AsyncSession = Depends(get_async_db)):
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     return video
 
+@router.get("/videos/{video_id}/file")
+def get_video_file(
+    video_id: int,
+    v: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Serve the local file of a video (handed off to nginx in accel mode, Range requests included)"""
+    video = db.query(Video).filter(Video.id == video_id).first()
+    if not video or not video.file_path:
+        raise HTTPException(status_code=404, detail="Video file not found")
+    return media_file_response(media_relative_path(video.file_path), version=v, if_none_match=if_none_match)
+
 @router.post("/videos", response_model=VideoResponse)
-def create_video(video: VideoCreate, db: Session = Depends(get_db)):
-    db_video = Video(**video.dict())
-    db.add(db_video)
-    db.commit()
-    db.refresh(db_video)
+def create_video(video: VideoCreate):
+    def write(session: Session) -> VideoResponse:
+        db_video = Video(**video.dict())
+        session.add(db_video)
+        session.commit()
+        # 本地视频交给转码任务（python -m commands.transcode）生成 HLS，封面和预览图在后台提取
+        queue_transcode(session, db_video)
+        return VideoResponse.model_validate(db_video)
+    
+    db_video = db_writer.run(write)
+    if db_video.file_path:
+        schedule_video_previews(db_video.id)
+    response_cache.invalidate(*VIDEO_TABLES)
     return db_video
 
+def _queue_bulk_transcodes(session: Session, written: List[WrittenRow]) -> None:
+    # 新的本地视频排队转码；已有任务（包括 upsert 更新的视频）保持原状态
+    local = [video_id for video_id, row, _ in written if row.get("file_path")]
+    if local:
+        session.execute(
+            sqlite_insert(VideoTranscode).on_conflict_do_nothing(index_elements=["video_id"]),
+            [{"video_id": video_id, "status": "pending"} for video_id in local]
+        )
+
+def _schedule_bulk_previews(written: List[WrittenRow]) -> None:
+    for video_id, row, created in written:
+        if created and row.get("file_path"):
+            schedule_video_previews(video_id)
+
+@router.post("/videos/bulk", response_model=BulkWriteResponse)
+async def bulk_create_videos(
+    request: Request,
+    upsert: bool = Query(False),
+    admin_verified: bool = Depends(verify_admin_key)
+):
+    """Create videos from a JSON array or NDJSON body; with upsert=true, items whose file_path exists update that video"""
+    result = await bulk_write(
+        request, VideoCreate, Video,
+        upsert_on="file_path" if upsert else None,
+        before_commit=_queue_bulk_transcodes,
+        after_commit=_schedule_bulk_previews
+    )
+    response_cache.invalidate(*VIDEO_TABLES)
+    return result
+
 @router.put("/videos/{video_id}", response_model=VideoResponse)
-def update_video(video_id: int, video_update: VideoUpdate, db: Session = Depends(get_db)):
-    db_video = db.query(Video).filter(Video.id == video_id).first()
-    if not db_video:
-        raise HTTPException(status_code=404, detail="Video not found")
-    
+def update_video(video_id: int, video_update: VideoUpdate):
     update_data = video_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_video, field, value)
     
-    db.commit()
-    db.refresh(db_video)
+    def write(session: Session) -> VideoResponse:
+        db_video = session.get(Video, video_id)
+        if not db_video:
+            raise HTTPException(status_code=404, detail="Video not found")
+        
+        for field, value in update_data.items():
+            setattr(db_video, field, value)
+        
+        session.commit()
+        if "file_path" in update_data:
+            queue_transcode(session, db_video)
+        return VideoResponse.model_validate(db_video)
+    
+    db_video = db_writer.run(write)
+    if "file_path" in update_data and db_video.file_path:
+        schedule_video_previews(db_video.id, force=True)
+    response_cache.invalidate(*VIDEO_TABLES)
     return db_video
 
 @router.delete("/videos/{video_id}")
-def delete_video(video_id: int, db: Session = Depends(get_db)):
-    db_video = db.query(Video).filter(Video.id == video_id).first()
-    if not db_video:
-        raise HTTPException(status_code=404, detail="Video not found")
+def delete_video(video_id: int):
+    def write(session: Session) -> None:
+        db_video = session.get(Video, video_id)
+        if not db_video:
+            raise HTTPException(status_code=404, detail="Video not found")
+        
+        session.delete(db_video)
+        session.commit()
     
-    db.delete(db_video)
-    db.commit()
+    db_writer.run(write)
+    remove_hls_output(video_id)
+    remove_video_previews(video_id)
+    response_cache.invalidate(*VIDEO_TABLES)
     return {"message": "Video deleted successfully"}
 
 # Featured content for homepage
 @router.get("/featured", response_model=FeaturedContentResponse)
-def get_featured_content(db: Session = Depends(get_db)):
-    photos = db.query(Photo).limit(6).all()
-    videos = db.query(Video).limit(4).all()
+async def get_featured_content(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        photos = (await db.scalars(select(Photo).limit(6))).all()
+        videos = (await db.scalars(select(Video).limit(4))).all()
+        return FeaturedContentResponse(photos=photos, videos=videos)
     
-    return FeaturedContentResponse(photos=photos, videos=videos)
+    return await cached_response(request, db, VIDEO_TABLES + ("photos",), build)
 
 # Gallery statistics
-@router.get("/stats", response_model=GalleryStatsResponse)
-def get_gallery_stats(db: Session = Depends(get_db)):
-    photo_count = db.query(Photo).count()
-    video_count = db.query(Video).count()
-    photo_categories = db.query(func.count(func.distinct(Photo.category))).scalar()
-    video_categories = db.query(func.count(func.distinct(Video.category))).scalar()
+async def _build_gallery_stats(db: AsyncSession) -> GalleryStatsResponse:
+    counters = await get_counters(db, ("photos", "videos"))
     
     return GalleryStatsResponse(
-        photos=photo_count,
-        videos=video_count,
-        photo_categories=photo_categories,
-        video_categories=video_categories
+        photos=counters["photos"].get("", 0),
+        videos=counters["videos"].get("", 0),
+        photo_categories=len(counters["photos.category"]),
+        video_categories=len(counters["videos.category"])
     )
 
-# Wall photos for featured section
-@router.get("/wall-photos")
-def get_wall_photos():
-    wall_pic_dir = os.path.join(settings.media_root, 'wall-pic')
-    
+@router.get("/stats", response_model=GalleryStatsResponse)
+async def get_gallery_stats(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await cached_response(request, db, ("photos", "videos"), lambda: _build_gallery_stats(db))
+
+# Shared helpers for the directory-backed photo endpoints (wall-pic / weibo)
+def _get_snapshot(index: MediaDirectoryIndex, label: str):
     try:
-        if os.path.exists(wall_pic_dir):
-            image_files = [f for f in os.listdir(wall_pic_dir) 
-                          if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp'))]
-            
-            if image_files:
-                # 解析文件名中的日期并排序
-                wall_photos = []
-                for image_file in image_files:
-                    photo_date = parse_filename_date(image_file)
-                    wall_photos.append({
-                        "filename": image_file,
-                        "url": f"{settings.media_url}wall-pic/{image_file}",
-                        "date": photo_date.isoformat() if photo_date else None
-                    })
-                
-                # 按日期排序（最新的在前）
-                wall_photos.sort(key=lambda x: x["date"] or "1900-01-01", reverse=True)
-                return {"photos": wall_photos}
-            else:
-                return {"photos": []}
-        else:
-            raise HTTPException(status_code=404, detail="Wall-pic directory not found")
-    except Exception as e:
+        snapshot = index.snapshot()
+    except OSError as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"{label} directory not found")
+    return snapshot
 
-# Get available years in wall-pic directory
-@router.get("/wall-photos/years")
-def get_wall_photo_years():
-    wall_pic_dir = os.path.join(settings.media_root, 'wall-pic')
-    
+def _list_photos(snapshot: MediaSnapshot, limit: Optional[int], cursor: Optional[str]):
     try:
-        if not os.path.exists(wall_pic_dir):
-            raise HTTPException(status_code=404, detail="Wall-pic directory not found")
-        
-        image_files = [f for f in os.listdir(wall_pic_dir) 
-                      if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp'))]
-        
-        # 按文件名解析年份
-        years_count = {}
-        for image_file in image_files:
-            photo_date = parse_filename_date(image_file)
-            if photo_date:
-                year = photo_date.year
-                years_count[year] = years_count.get(year, 0) + 1
-        
-        # 生成年份数据
-        years = []
-        for year, count in years_count.items():
-            years.append({
-                "year": year,
-                "photo_count": count
-            })
-        
-        # 按年份降序排列
-        years.sort(key=lambda x: x["year"], reverse=True)
-        return {"years": years}
+        photos, next_cursor = snapshot.page(cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {"photos": photos, "next_cursor": next_cursor}
 
-# Get photos by year and optionally by month
-@router.get("/wall-photos/{year}")
-def get_wall_photos_by_year(
-    year: int,
-    month: Optional[int] = Query(None, ge=1, le=12)
-):
-    wall_pic_dir = os.path.join(settings.media_root, 'wall-pic')
+def _list_photo_years(snapshot: MediaSnapshot):
+    return {"years": snapshot.years}
+
+def _list_photos_by_year(snapshot: MediaSnapshot, year: int, month: Optional[int], include_by_month: bool):
+    if not snapshot.entries:
+        return {"photos": [], "months": []}
     
-    try:
-        if not os.path.exists(wall_pic_dir):
-            raise HTTPException(status_code=404, detail=f"Wall-pic directory not found")
-        
-        image_files = [f for f in os.listdir(wall_pic_dir) 
-                      if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp'))]
-        
-        if not image_files:
-            return {"photos": [], "months": []}
-        
-        # 按文件名解析日期，筛选指定年份的照片
-        photos_by_month = {}
-        for image_file in image_files:
-            photo_date = parse_filename_date(image_file)
-            if photo_date and photo_date.year == year:
-                file_month = photo_date.month
-                
-                if file_month not in photos_by_month:
-                    photos_by_month[file_month] = []
-                
-                photos_by_month[file_month].append({
-                    "filename": image_file,
-                    "url": f"{settings.media_url}wall-pic/{image_file}",
-                    "date": photo_date.isoformat()
-                })
-        
-        # 按月份排序照片（最新的在前）
-        for month_photos in photos_by_month.values():
-            month_photos.sort(key=lambda x: x["date"], reverse=True)
-        
-        # 生成月份统计
-        months = []
-        for month_num in sorted(photos_by_month.keys(), reverse=True):
-            months.append({
-                "month": month_num,
-                "photo_count": len(photos_by_month[month_num])
-            })
-        
-        # 如果指定了月份，只返回该月份的照片
-        if month:
-            if month in photos_by_month:
-                return {
-                    "photos": photos_by_month[month],
-                    "months": months,
-                    "year": year,
-                    "selected_month": month
-                }
-            else:
-                return {
-                    "photos": [],
-                    "months": months,
-                    "year": year,
-                    "selected_month": month
-                }
-        
-        # 返回所有照片，按月份分组
-        all_photos = []
-        for month_num in sorted(photos_by_month.keys(), reverse=True):
-            all_photos.extend(photos_by_month[month_num])
-        
+    months = snapshot.months(year)
+    
+    # 如果指定了月份，只返回该月份的照片
+    if month:
         return {
-            "photos": all_photos,
-            "photos_by_month": photos_by_month,
+            "photos": snapshot.month_photos(year, month),
             "months": months,
-            "year": year
+            "year": year,
+            "selected_month": month
         }
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = {
+        "photos": snapshot.year_photos(year),
+        "months": months,
+        "year": year
+    }
+    
+    # 按月份分组（与 photos 内容重复，客户端可通过 include_by_month=false 省略）
+    if include_by_month:
+        result["photos_by_month"] = {
+            item["month"]: snapshot.month_photos(year, item["month"])
+            for item in months
+        }
+    
+    return result
+
+# Wall photos for featured section
+@router.get("/wall-photos")
+def get_wall_photos(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None)
+):
+    snapshot = _get_snapshot(wall_index, "Wall-pic")
+    return conditional_response(request, snapshot.version, lambda: _list_photos(snapshot, limit, cursor))
+
+# Get available years in wall-pic directory
+@router.get("/wall-photos/years")
+def get_wall_photo_years(request: Request):
+    snapshot = _get_snapshot(wall_index, "Wall-pic")
+    return conditional_response(request, snapshot.version, lambda: _list_photo_years(snapshot))
+
+# Get photos by year and optionally by month
+@router.get("/wall-photos/{year}")
+def get_wall_photos_by_year(
+    request: Request,
+    year: int,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    include_by_month: bool = Query(True)
+):
+    snapshot = _get_snapshot(wall_index, "Wall-pic")
+    return conditional_response(
+        request,
+        snapshot.version,
+        lambda: _list_photos_by_year(snapshot, year, month, include_by_month)
+    )
 
-# Random hero image
+# Random hero image (also served at /api/random-hero-image, see main.py)
 @router.get("/random-hero", response_model=RandomHeroResponse)
 def get_random_hero_image():
-    pic_dir = os.path.join(settings.media_root, 'pic')
-    
     try:
-        if os.path.exists(pic_dir):
-            image_files = [f for f in os.listdir(pic_dir) 
-                          if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp'))]
-            
-            if image_files:
-                random_image = random.choice(image_files)
-                image_url = f"{settings.media_url}pic/{random_image}"
-                return RandomHeroResponse(image_url=image_url)
-            else:
-                raise HTTPException(status_code=404, detail="No images found")
-        else:
-            raise HTTPException(status_code=404, detail="Image directory not found")
-    except Exception as e:
+        image = hero_deck.pick()
+    except OSError as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-# 解析微博文件名中的日期信息
-def parse_weibo_filename_date(filename):
-    """
-    解析微博文件名中的日期，支持格式：YYYY-MM-DD.jpg 或 YYYY-MM-DD-N.jpg
-    例如：2015-11-12.jpg -> 2015-11-12
-    """
-    try:
-        # 匹配 YYYY-MM-DD 格式
-        pattern = r'(\d{4})-(\d{2})-(\d{2})'
-        match = re.search(pattern, filename)
-        
-        if match:
-            year = int(match.group(1))
-            month = int(match.group(2))
-            day = int(match.group(3))
-            return datetime(year, month, day)
-    except ValueError:
-        pass
+    if image is None:
+        raise HTTPException(status_code=404, detail="No images found")
     
-    return None
+    return RandomHeroResponse(
+        image_url=image["url"],
+        filename=image["filename"],
+        thumbnail=image.get("thumbnail"),
+        srcset=image.get("srcset"),
+        width=image.get("width"),
+        height=image.get("height"),
+        dominant_color=image.get("dominant_color"),
+        placeholder=image.get("placeholder")
+    )
 
 # Weibo photos endpoints
 @router.get("/weibo-photos")
-def get_weibo_photos():
-    weibo_dir = os.path.join(settings.media_root, 'weibo')
-    
-    try:
-        if os.path.exists(weibo_dir):
-            image_files = [f for f in os.listdir(weibo_dir) 
-                          if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp'))]
-            
-            if image_files:
-                # 解析文件名中的日期并排序
-                weibo_photos = []
-                for image_file in image_files:
-                    photo_date = parse_weibo_filename_date(image_file)
-                    weibo_photos.append({
-                        "filename": image_file,
-                        "url": f"{settings.media_url}weibo/{image_file}",
-                        "date": photo_date.isoformat() if photo_date else None
-                    })
-                
-                # 按日期排序（最新的在前）
-                weibo_photos.sort(key=lambda x: x["date"] or "1900-01-01", reverse=True)
-                return {"photos": weibo_photos}
-            else:
-                return {"photos": []}
-        else:
-            raise HTTPException(status_code=404, detail="Weibo directory not found")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def get_weibo_photos(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None)
+):
+    snapshot = _get_snapshot(weibo_index, "Weibo")
+    return conditional_response(request, snapshot.version, lambda: _list_photos(snapshot, limit, cursor))
 
 # Get available years in weibo directory
 @router.get("/weibo-photos/years")
-def get_weibo_photo_years():
-    weibo_dir = os.path.join(settings.media_root, 'weibo')
-    
-    try:
-        if not os.path.exists(weibo_dir):
-            raise HTTPException(status_code=404, detail="Weibo directory not found")
-        
-        image_files = [f for f in os.listdir(weibo_dir) 
-                      if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp'))]
-        
-        # 按文件名解析年份
-        years_count = {}
-        for image_file in image_files:
-            photo_date = parse_weibo_filename_date(image_file)
-            if photo_date:
-                year = photo_date.year
-                years_count[year] = years_count.get(year, 0) + 1
-        
-        # 生成年份数据
-        years = []
-        for year, count in years_count.items():
-            years.append({
-                "year": year,
-                "photo_count": count
-            })
-        
-        # 按年份降序排列
-        years.sort(key=lambda x: x["year"], reverse=True)
-        return {"years": years}
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def get_weibo_photo_years(request: Request):
+    snapshot = _get_snapshot(weibo_index, "Weibo")
+    return conditional_response(request, snapshot.version, lambda: _list_photo_years(snapshot))
 
 # Get weibo photos by year and optionally by month
 @router.get("/weibo-photos/{year}")
 def get_weibo_photos_by_year(
+    request: Request,
     year: int,
-    month: Optional[int] = Query(None, ge=1, le=12)
+    month: Optional[int] = Query(None, ge=1, le=12),
+    include_by_month: bool = Query(True)
 ):
-    weibo_dir = os.path.join(settings.media_root, 'weibo')
-    
-    try:
-        if not os.path.exists(weibo_dir):
-            raise HTTPException(status_code=404, detail=f"Weibo directory not found")
-        
-        image_files = [f for f in os.listdir(weibo_dir) 
-                      if f.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp'))]
-        
-        if not image_files:
-            return {"photos": [], "months": []}
-        
-        # 按文件名解析日期，筛选指定年份的照片
-        photos_by_month = {}
-        for image_file in image_files:
-            photo_date = parse_weibo_filename_date(image_file)
-            if photo_date and photo_date.year == year:
-                file_month = photo_date.month
-                
-                if file_month not in photos_by_month:
-                    photos_by_month[file_month] = []
-                
-                photos_by_month[file_month].append({
-                    "filename": image_file,
-                    "url": f"{settings.media_url}weibo/{image_file}",
-                    "date": photo_date.isoformat()
-                })
-        
-        # 按月份排序照片（最新的在前）
-        for month_photos in photos_by_month.values():
-            month_photos.sort(key=lambda x: x["date"], reverse=True)
-        
-        # 生成月份统计
-        months = []
-        for month_num in sorted(photos_by_month.keys(), reverse=True):
-            months.append({
-                "month": month_num,
-                "photo_count": len(photos_by_month[month_num])
-            })
-        
-        # 如果指定了月份，只返回该月份的照片
-        if month:
-            if month in photos_by_month:
-                return {
-                    "photos": photos_by_month[month],
-                    "months": months,
-                    "year": year,
-                    "selected_month": month
-                }
-            else:
-                return {
-                    "photos": [],
-                    "months": months,
-                    "year": year,
-                    "selected_month": month
-                }
-        
-        # 返回所有照片，按月份分组
-        all_photos = []
-        for month_num in sorted(photos_by_month.keys(), reverse=True):
-            all_photos.extend(photos_by_month[month_num])
-        
-        return {
-            "photos": all_photos,
-            "photos_by_month": photos_by_month,
-            "months": months,
-            "year": year
-        }
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    snapshot = _get_snapshot(weibo_index, "Weibo")
+    return conditional_response(
+        request,
+        snapshot.version,
+        lambda: _list_photos_by_year(snapshot, year, month, include_by_month)
+    )
+
+# Admin: force a rescan of the cached media directories (e.g. after a bulk upload)
+@router.post("/admin/rescan-media")
+def rescan_media(admin_verified: bool = Depends(verify_admin_key)):
+    return {"directories": rescan_media_indexes()}
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from core.database import get_async_db
+from core.search import apply_search
+from models import Photo, Video, TimelineEvent
+from schemas import SearchResponse
+
+router = APIRouter()
+
+SEARCH_TYPES = {
+    "photos": ("photos", Photo),
+    "videos": ("videos", Video),
+    "events": ("timeline_events", TimelineEvent),
+}
+
+@router.get("/search", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=100),
+    types: Optional[List[str]] = Query(None, description="photos, videos, events; default all"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Ranked full-text search across photos, videos and timeline events"""
+    result = {key: [] for key in SEARCH_TYPES}
+    for key, (name, model) in SEARCH_TYPES.items():
+        if types and key not in types:
+            continue
+        query = apply_search(select(model), name, q)
+        result[key] = (await db.scalars(query.order_by(model.id.desc()).limit(limit))).all()
+    return result
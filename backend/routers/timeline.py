@@ -1,102 +1,130 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import extract, func
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from core.database import get_db
+from core.bulk_write import bulk_write
+from core.counters import get_counters
+from core.database import get_async_db, verify_admin_key
+from core.db_writer import db_writer
+from core.pagination import paginate
+from core.search import apply_search
+from core.response_cache import cached_response, response_cache
 from models import TimelineEvent
 from schemas import (
     TimelineEventResponse, TimelineEventCreate, TimelineEventUpdate,
-    FeaturedEventsResponse, TimelineStatsResponse
+    FeaturedEventsResponse, TimelineStatsResponse, BulkWriteResponse
 )
 
 router = APIRouter()
 
 # Timeline event endpoints
 @router.get("/events", response_model=List[TimelineEventResponse])
-def get_timeline_events(
+async def get_timeline_events(
+    response: Response,
     event_type: Optional[str] = Query(None),
     is_featured: Optional[bool] = Query(None),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(TimelineEvent)
+    query = select(TimelineEvent)
     
     if event_type:
-        query = query.filter(TimelineEvent.event_type == event_type)
+        query = query.where(TimelineEvent.event_type == event_type)
     
     if is_featured is not None:
-        query = query.filter(TimelineEvent.is_featured == is_featured)
+        query = query.where(TimelineEvent.is_featured == is_featured)
     
+    # 搜索结果按相关度排序，只能按 offset 分页
     if search:
-        query = query.filter(
-            TimelineEvent.title.contains(search) | 
-            TimelineEvent.description.contains(search) |
-            TimelineEvent.location.contains(search)
-        )
+        query = apply_search(query, "timeline_events", search)
+        query = query.order_by(TimelineEvent.event_date.desc()).offset(skip).limit(limit)
+        return (await db.scalars(query)).all()
     
-    events = query.order_by(TimelineEvent.event_date.desc()).offset(skip).limit(limit).all()
-    return events
+    return await paginate(
+        db, query, TimelineEvent.event_date, TimelineEvent.id, response, cursor=cursor, skip=skip, limit=limit
+    )
 
 @router.get("/events/{event_id}", response_model=TimelineEventResponse)
-def get_timeline_event(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(TimelineEvent).filter(TimelineEvent.id == event_id).first()
+async def get_timeline_event(event_id: int, db: AsyncSession = Depends(get_async_db)):
+    event = await db.get(TimelineEvent, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Timeline event not found")
     return event
 
 @router.post("/events", response_model=TimelineEventResponse)
-def create_timeline_event(event: TimelineEventCreate, db: Session = Depends(get_db)):
-    db_event = TimelineEvent(**event.dict())
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+def create_timeline_event(event: TimelineEventCreate):
+    def write(session: Session) -> TimelineEventResponse:
+        db_event = TimelineEvent(**event.dict())
+        session.add(db_event)
+        session.commit()
+        return TimelineEventResponse.model_validate(db_event)
+    
+    db_event = db_writer.run(write)
+    response_cache.invalidate("timeline_events")
     return db_event
 
+@router.post("/events/bulk", response_model=BulkWriteResponse)
+async def bulk_create_timeline_events(request: Request, admin_verified: bool = Depends(verify_admin_key)):
+    """Create timeline events from a JSON array or NDJSON body"""
+    result = await bulk_write(request, TimelineEventCreate, TimelineEvent)
+    response_cache.invalidate("timeline_events")
+    return result
+
 @router.put("/events/{event_id}", response_model=TimelineEventResponse)
-def update_timeline_event(event_id: int, event_update: TimelineEventUpdate, db: Session = Depends(get_db)):
-    db_event = db.query(TimelineEvent).filter(TimelineEvent.id == event_id).first()
-    if not db_event:
-        raise HTTPException(status_code=404, detail="Timeline event not found")
+def update_timeline_event(event_id: int, event_update: TimelineEventUpdate):
+    def write(session: Session) -> TimelineEventResponse:
+        db_event = session.get(TimelineEvent, event_id)
+        if not db_event:
+            raise HTTPException(status_code=404, detail="Timeline event not found")
+        
+        update_data = event_update.dict(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(db_event, field, value)
+        
+        session.commit()
+        return TimelineEventResponse.model_validate(db_event)
     
-    update_data = event_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_event, field, value)
-    
-    db.commit()
-    db.refresh(db_event)
+    db_event = db_writer.run(write)
+    response_cache.invalidate("timeline_events")
     return db_event
 
 @router.delete("/events/{event_id}")
-def delete_timeline_event(event_id: int, db: Session = Depends(get_db)):
-    db_event = db.query(TimelineEvent).filter(TimelineEvent.id == event_id).first()
-    if not db_event:
-        raise HTTPException(status_code=404, detail="Timeline event not found")
+def delete_timeline_event(event_id: int):
+    def write(session: Session) -> None:
+        db_event = session.get(TimelineEvent, event_id)
+        if not db_event:
+            raise HTTPException(status_code=404, detail="Timeline event not found")
+        
+        session.delete(db_event)
+        session.commit()
     
-    db.delete(db_event)
-    db.commit()
+    db_writer.run(write)
+    response_cache.invalidate("timeline_events")
     return {"message": "Timeline event deleted successfully"}
 
 # Featured events for homepage
 @router.get("/featured", response_model=FeaturedEventsResponse)
-def get_featured_events(db: Session = Depends(get_db)):
-    events = db.query(TimelineEvent).filter(TimelineEvent.is_featured == True).limit(5).all()
-    return FeaturedEventsResponse(events=events)
+async def get_featured_events(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        events = (await db.scalars(select(TimelineEvent).where(TimelineEvent.is_featured == True).limit(5))).all()
+        return FeaturedEventsResponse(events=events)
+    
+    return await cached_response(request, db, ("timeline_events",), build)
 
 # Timeline statistics and years
-@router.get("/stats", response_model=TimelineStatsResponse)
-def get_timeline_stats(db: Session = Depends(get_db)):
-    # Get distinct years from event_date
-    years_result = db.query(extract('year', TimelineEvent.event_date)).distinct().all()
-    years = [int(year[0]) for year in years_result]
-    years.sort(reverse=True)
-    
-    total_events = db.query(TimelineEvent).count()
-    featured_events = db.query(TimelineEvent).filter(TimelineEvent.is_featured == True).count()
+async def _build_timeline_stats(db: AsyncSession) -> TimelineStatsResponse:
+    counters = await get_counters(db, ("timeline_events",))
     
     return TimelineStatsResponse(
-        years=years,
-        total_events=total_events,
-        featured_events=featured_events
-    )
\ No newline at end of file
+        years=sorted((int(year) for year in counters["timeline_events.year"]), reverse=True),
+        total_events=counters["timeline_events"].get("", 0),
+        featured_events=counters["timeline_events.featured"].get("1", 0)
+    )
+
+@router.get("/stats", response_model=TimelineStatsResponse)
+async def get_timeline_stats(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await cached_response(request, db, ("timeline_events",), lambda: _build_timeline_stats(db))
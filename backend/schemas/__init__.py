@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime, date
-from typing import Optional
+from typing import Dict, List, Optional
 from enum import Enum
 
 class CategoryEnum(str, Enum):
@@ -24,6 +24,11 @@ class MessageStatusEnum(str, Enum):
     approved = "approved"
     rejected = "rejected"
 
+class ModerationActionEnum(str, Enum):
+    approve = "approve"
+    reject = "reject"
+    delete = "delete"
+
 # Photo schemas
 class PhotoBase(BaseModel):
     title: str = Field(..., max_length=200)
@@ -41,6 +46,7 @@ class PhotoUpdate(BaseModel):
 
 class PhotoResponse(PhotoBase):
     id: int
+    url: Optional[str] = None  # file_path as a versioned URL (?v=...), cacheable forever
     created_at: datetime
     updated_at: datetime
     
@@ -69,6 +75,9 @@ class VideoUpdate(BaseModel):
 
 class VideoResponse(VideoBase):
     id: int
+    file_url: Optional[str] = None  # Local file endpoint with ?v=..., cacheable forever
+    hls_url: Optional[str] = None  # HLS master playlist, set once transcoding finished
+    sprite_vtt_url: Optional[str] = None  # Scrubbing thumbnails (WebVTT + sprite sheet)
     created_at: datetime
     updated_at: datetime
     
@@ -125,8 +134,20 @@ class TimelineStatsResponse(BaseModel):
     total_events: int
     featured_events: int
 
+class SearchResponse(BaseModel):
+    photos: List[PhotoResponse]
+    videos: List[VideoResponse]
+    events: List[TimelineEventResponse]
+
 class RandomHeroResponse(BaseModel):
     image_url: str
+    filename: str = ""
+    thumbnail: Optional[str] = None
+    srcset: Optional[Dict[str, str]] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    dominant_color: Optional[str] = None
+    placeholder: Optional[str] = None
 
 # Message schemas
 class MessageBase(BaseModel):
@@ -149,6 +170,9 @@ class MessageResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class MessageListResponse(MessageResponse):
+    liked_by_me: Optional[bool] = None  # 仅在 with_liked=true 时返回（未设置时不输出）
+
 class MessageAdminResponse(MessageResponse):
     ip_address: str
     spam_score: float
@@ -159,6 +183,18 @@ class MessageUpdate(BaseModel):
     status: MessageStatusEnum
     approved_by: Optional[str] = None
 
+class MessageBulkModeration(BaseModel):
+    action: ModerationActionEnum
+    # 选择条件：ids 和过滤条件可以组合，至少给出一个
+    ids: Optional[List[int]] = Field(None, max_length=5000)
+    status: Optional[MessageStatusEnum] = None
+    min_spam_score: Optional[float] = None
+
+class MessageBulkModerationResponse(BaseModel):
+    action: ModerationActionEnum
+    affected: int
+    counts: Dict[str, int]  # 操作后各状态的留言数
+
 class MessageStatsResponse(BaseModel):
     total_messages: int
     pending_messages: int
@@ -171,4 +207,18 @@ class MessageLikeResponse(BaseModel):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Bulk create/upsert schemas
+class BulkItemResult(BaseModel):
+    index: int  # Position of the item in the request (array index or NDJSON line)
+    status: str  # created, updated, superseded, error
+    id: Optional[int] = None
+    error: Optional[str] = None
+    superseded_by: Optional[int] = None  # Index of the later item with the same key that was written instead
+
+class BulkWriteResponse(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    items: List[BulkItemResult]
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+# Settings are read when core.database is first imported: point the app at a scratch
+# database and media directory before any test module imports it
+_root = tempfile.mkdtemp(prefix="zhaolusi-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_root, 'test.db')}"
+os.environ["MEDIA_ROOT"] = os.path.join(_root, "media")
+os.environ["METADATA_SYNC_LOCK"] = os.path.join(_root, ".metadata-sync.lock")
+os.makedirs(os.environ["MEDIA_ROOT"])
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+    # with: runs startup (tables, triggers, migrations) and shutdown (closes aiosqlite threads)
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session")
+def admin_headers():
+    from core.database import settings
+    return {"X-API-Key": settings.admin_api_key}
+
+@pytest.fixture
+def media_root():
+    from core.database import settings
+    return settings.media_root
@@ -0,0 +1,51 @@
+import threading
+import pytest
+from core.database import SessionLocal
+from core.db_writer import db_writer
+from models import Message
+
+@pytest.fixture
+def writer_jobs(monkeypatch):
+    """Thread names the write jobs ran on"""
+    threads = []
+    run = db_writer.run
+
+    def spy(job):
+        def traced(session):
+            threads.append(threading.current_thread().name)
+            return job(session)
+        return run(traced)
+
+    monkeypatch.setattr(db_writer, "run", spy)
+    return threads
+
+def _pending_message() -> int:
+    with SessionLocal() as db:
+        message = Message(nickname="admin-write", content="moderate me", email="", ip_address="127.0.0.1")
+        db.add(message)
+        db.commit()
+        return message.id
+
+def test_moderation_runs_on_writer_thread(client, admin_headers, writer_jobs):
+    message_id = _pending_message()
+    response = client.put(f"/api/admin/messages/{message_id}/approve", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "approved" and response.json()["approved_at"]
+
+    response = client.put(f"/api/admin/messages/{message_id}/reject", headers=admin_headers)
+    assert response.json()["status"] == "rejected"
+
+    assert client.delete(f"/api/admin/messages/{message_id}", headers=admin_headers).status_code == 200
+    assert client.delete(f"/api/admin/messages/{message_id}", headers=admin_headers).status_code == 404
+    assert writer_jobs == ["db-writer"] * 4
+
+def test_gallery_and_timeline_writes_run_on_writer_thread(client, writer_jobs):
+    photo = client.post("/api/gallery/photos", json={"title": "admin write", "file_path": "/media/admin-write.jpg"}).json()
+    response = client.put(f"/api/gallery/photos/{photo['id']}", json={"title": "renamed"})
+    assert response.json()["title"] == "renamed"
+    assert client.delete(f"/api/gallery/photos/{photo['id']}").status_code == 200
+    assert client.put(f"/api/gallery/photos/{photo['id']}", json={"title": "gone"}).status_code == 404
+
+    event = client.post("/api/timeline/events", json={"title": "admin write", "description": "", "event_date": "2025-01-01"}).json()
+    assert client.delete(f"/api/timeline/events/{event['id']}").status_code == 200
+    assert writer_jobs == ["db-writer"] * 6
@@ -0,0 +1,54 @@
+import json
+from core.database import SessionLocal
+from models import Photo
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+def _ndjson(*lines) -> str:
+    return "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines) + "\n"
+
+def test_ndjson_upsert_reports_every_line(client, admin_headers):
+    headers = {**admin_headers, **NDJSON}
+    seeded = client.post("/api/gallery/photos/bulk", headers=headers, content=_ndjson(
+        {"title": "old a", "file_path": "/media/bulk/a.jpg"}
+    )).json()
+    assert seeded["created"] == 1
+    photo_a = seeded["items"][0]["id"]
+
+    result = client.post("/api/gallery/photos/bulk", params={"upsert": "true"}, headers=headers, content=_ndjson(
+        {"title": "new a", "file_path": "bulk/a.jpg"},
+        "{not json",
+        {"title": "first b", "file_path": "bulk/b.jpg"},
+        {"title": "no path"},
+        {"title": "second b", "file_path": "/media/bulk/b.jpg"},
+        {"title": "bad category", "file_path": "bulk/c.jpg", "category": "nope"}
+    ))
+    assert result.status_code == 200
+    body = result.json()
+    assert (body["created"], body["updated"], body["failed"]) == (1, 1, 3)
+
+    items = body["items"]
+    assert [item["index"] for item in items] == list(range(6))
+    assert [item["status"] for item in items] == ["updated", "error", "superseded", "error", "created", "error"]
+    assert items[0]["id"] == photo_a
+    assert items[1]["error"].startswith("Invalid JSON")
+    assert items[2]["superseded_by"] == 4 and items[2]["id"] is None
+    assert "file_path" in items[3]["error"]
+    assert "category" in items[5]["error"]
+
+    with SessionLocal() as db:
+        assert db.get(Photo, photo_a).title == "new a"
+        assert db.get(Photo, items[4]["id"]).title == "second b"
+        assert db.query(Photo).filter(Photo.file_path.like("%bulk/c.jpg")).count() == 0
+
+def test_bulk_requires_admin_key(client):
+    response = client.post("/api/gallery/photos/bulk", headers={**NDJSON, "X-API-Key": "wrong"}, content=_ndjson(
+        {"title": "anonymous", "file_path": "bulk/anonymous.jpg"}
+    ))
+    assert response.status_code == 401
+    with SessionLocal() as db:
+        assert db.query(Photo).filter(Photo.file_path == "bulk/anonymous.jpg").count() == 0
+
+def test_json_array_body_must_be_a_list(client, admin_headers):
+    response = client.post("/api/gallery/photos/bulk", headers=admin_headers, json={"title": "not a list"})
+    assert response.status_code == 400
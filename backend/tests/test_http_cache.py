@@ -0,0 +1,75 @@
+import os
+from core.database import SessionLocal
+from models import Message
+
+def _wall_photo(media_root: str, filename: str) -> None:
+    directory = os.path.join(media_root, "wall-pic")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, filename), "wb") as f:
+        f.write(b"not decoded")
+
+def _revalidate(client, path, params, response):
+    return client.get(path, params=params, headers={"If-None-Match": response.headers["ETag"]})
+
+def test_wall_photo_cursor_pages_and_etags(client, media_root):
+    for day in range(1, 8):
+        _wall_photo(media_root, f"2024年03月{day:02d}日1.jpg")
+
+    everything = client.get("/api/gallery/wall-photos").json()["photos"]
+    pages, params = [], {"limit": 3}
+    while True:
+        response = client.get("/api/gallery/wall-photos", params=params)
+        assert response.status_code == 200
+        # 每一页（包括带游标的页）都能用 ETag 重新验证
+        assert _revalidate(client, "/api/gallery/wall-photos", params, response).status_code == 304
+        body = response.json()
+        pages.append(body["photos"])
+        if not body["next_cursor"]:
+            break
+        params = {"limit": 3, "cursor": body["next_cursor"]}
+
+    assert [photo for page in pages for photo in page] == everything
+    assert [len(page) for page in pages] == [3, 3, 1]
+
+    # 目录变化后旧 ETag 失效，游标仍从原位置继续
+    first = client.get("/api/gallery/wall-photos", params={"limit": 3})
+    _wall_photo(media_root, "2024年03月08日1.jpg")
+    assert _revalidate(client, "/api/gallery/wall-photos", {"limit": 3}, first).status_code == 200
+    after_cursor = client.get("/api/gallery/wall-photos", params={"limit": 3, "cursor": first.json()["next_cursor"]})
+    assert after_cursor.json()["photos"] == pages[1]
+
+def test_bad_wall_photo_cursor(client, media_root):
+    _wall_photo(media_root, "2024年03月01日1.jpg")
+    assert client.get("/api/gallery/wall-photos", params={"cursor": "garbage"}).status_code == 400
+
+def test_cached_message_page_revalidates_until_a_write(client, admin_headers):
+    with SessionLocal() as db:
+        db.add_all([
+            Message(nickname="cache", content=f"cached {i}", email="", ip_address="10.0.0.2")
+            for i in range(3)
+        ])
+        db.commit()
+        pending = [m.id for m in db.query(Message).filter(Message.nickname == "cache")]
+    for message_id in pending[:2]:
+        client.put(f"/api/admin/messages/{message_id}/approve", headers=admin_headers)
+
+    params = {"limit": 1}
+    first = client.get("/api/messages", params=params)
+    # 第二次命中响应缓存：同样的内容、ETag 和下一页游标
+    cached = client.get("/api/messages", params=params)
+    assert cached.content == first.content
+    assert cached.headers["ETag"] == first.headers["ETag"]
+    assert cached.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert _revalidate(client, "/api/messages", params, first).status_code == 304
+
+    second_page = client.get("/api/messages", params={"limit": 1, "cursor": first.headers["X-Next-Cursor"]}).json()
+    assert second_page[0]["id"] != first.json()[0]["id"]
+
+    client.put(f"/api/admin/messages/{pending[2]}/approve", headers=admin_headers)
+    changed = _revalidate(client, "/api/messages", params, first)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert changed.json()[0]["id"] == pending[2]
+
+    stats = client.get("/api/messages/stats")
+    assert _revalidate(client, "/api/messages/stats", {}, stats).status_code == 304
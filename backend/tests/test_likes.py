@@ -0,0 +1,59 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+import pytest
+from fastapi import HTTPException
+from core.database import SessionLocal
+from core.like_buffer import like_buffer
+from models import Message, MessageLike
+
+def _approved_message() -> int:
+    with SessionLocal() as db:
+        message = Message(
+            nickname="likes", content="like me", email="", ip_address="10.0.0.3",
+            status="approved", approved_at=datetime.datetime.now()
+        )
+        db.add(message)
+        db.commit()
+        return message.id
+
+def _stored_counts(message_id: int):
+    with SessionLocal() as db:
+        return (
+            db.get(Message, message_id).likes_count,
+            db.query(MessageLike).filter(MessageLike.message_id == message_id).count()
+        )
+
+def test_concurrent_likes_keep_count_in_sync(client):
+    message_id = _approved_message()
+    ips = [f"10.1.0.{i}" for i in range(60)]
+
+    # 直接提交给 like_buffer（绕过按 IP 的限流），多线程同时点赞，每个 IP 各重复一次
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        futures = [pool.submit(lambda ip=ip: like_buffer.submit(message_id, ip, liked=True).result()) for ip in ips * 2]
+        wait(futures)
+    counts = [future.result() for future in futures if future.exception() is None]
+    duplicates = [future.exception() for future in futures if future.exception() is not None]
+    assert len(counts) == len(ips)
+    assert sorted(counts) == list(range(1, len(ips) + 1))
+    assert all(isinstance(e, HTTPException) and e.status_code == 400 for e in duplicates)
+    assert _stored_counts(message_id) == (len(ips), len(ips))
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        wait([pool.submit(lambda ip=ip: like_buffer.submit(message_id, ip, liked=False).result()) for ip in ips[:25]])
+    assert _stored_counts(message_id) == (len(ips) - 25, len(ips) - 25)
+
+def test_like_endpoints_report_stored_count(client):
+    message_id = _approved_message()
+    response = client.post(f"/api/messages/{message_id}/like")
+    assert response.status_code == 200 and response.json()["likes_count"] == 1
+    assert client.post(f"/api/messages/{message_id}/like").status_code == 400
+    assert client.get("/api/messages/like-status", params={"ids": [message_id]}).json() == {str(message_id): True}
+
+    response = client.delete(f"/api/messages/{message_id}/like")
+    assert response.status_code == 200 and response.json()["likes_count"] == 0
+    assert _stored_counts(message_id) == (0, 0)
+
+def test_like_unknown_message():
+    with pytest.raises(HTTPException) as error:
+        like_buffer.submit(10 ** 9, "10.1.1.1", liked=True).result()
+    assert error.value.status_code == 404
@@ -0,0 +1,52 @@
+import sys
+from sqlalchemy import create_engine, text
+import commands.migrate as migrate_command
+from core.migrations import MIGRATIONS, current_version
+
+# Tables as deployed before versioned migrations existed: no composite indexes, and
+# message_likes without the unique (message_id, ip_address) index
+BASELINE_SCHEMA = [
+    """CREATE TABLE photos (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, file_path VARCHAR(500) NOT NULL,
+       category VARCHAR(20), description TEXT, created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE videos (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, file_path VARCHAR(500),
+       embed_link VARCHAR(500), category VARCHAR(20), description TEXT, thumbnail VARCHAR(500),
+       created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE timeline_events (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT NOT NULL,
+       event_date DATE NOT NULL, event_type VARCHAR(20), location VARCHAR(200), image VARCHAR(500),
+       is_featured BOOLEAN, created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE messages (id INTEGER PRIMARY KEY, nickname VARCHAR(50) NOT NULL, content TEXT NOT NULL,
+       email VARCHAR(100), ip_address VARCHAR(45) NOT NULL, status VARCHAR(20), spam_score FLOAT,
+       likes_count INTEGER, created_at DATETIME, approved_at DATETIME, approved_by VARCHAR(50))""",
+    """CREATE TABLE message_likes (id INTEGER PRIMARY KEY, message_id INTEGER NOT NULL REFERENCES messages (id),
+       ip_address VARCHAR(45) NOT NULL, created_at DATETIME)""",
+    """CREATE TABLE banned_words (id INTEGER PRIMARY KEY, word VARCHAR(100) NOT NULL, severity VARCHAR(10),
+       created_at DATETIME)""",
+]
+
+def test_migrations_upgrade_baseline_schema(tmp_path, monkeypatch, capsys):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text(
+            "INSERT INTO messages (id, nickname, content, ip_address, status, likes_count) "
+            "VALUES (1, 'n', 'c', '10.0.0.1', 'approved', 3)"
+        ))
+        # 重复点赞：迁移 1 去重并重算 likes_count
+        conn.execute(text(
+            "INSERT INTO message_likes (message_id, ip_address) VALUES (1, 'a'), (1, 'a'), (1, 'b')"
+        ))
+
+    monkeypatch.setattr(migrate_command, "engine", engine)
+    monkeypatch.setattr(sys, "argv", ["migrate", "--check"])
+    migrate_command.main()  # 有全表扫描时以 sys.exit(1) 退出
+    assert "all hot queries use an index" in capsys.readouterr().out
+
+    with engine.connect() as conn:
+        assert current_version(conn) == max(version for version, _, _ in MIGRATIONS)
+        assert conn.execute(text("SELECT COUNT(*) FROM message_likes")).scalar() == 2
+        assert conn.execute(text("SELECT likes_count FROM messages WHERE id = 1")).scalar() == 2
+
+    # 再次运行不应重复应用
+    migrate_command.main()
+    assert "applied: none" in capsys.readouterr().out
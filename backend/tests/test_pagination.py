@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from core.database import SessionLocal
+from core.pagination import encode_cursor
+from models import Message
+
+def _pages(client, path, params):
+    """Follow X-Next-Cursor from the first page to the last; returns the pages' id lists"""
+    pages, cursor = [], None
+    while True:
+        response = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        pages.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+def _approved_messages(approved_at):
+    db = SessionLocal()
+    messages = [
+        Message(nickname="pager", content=f"page {i}", status="approved", approved_at=value, ip_address="10.0.0.1")
+        for i, value in enumerate(approved_at)
+    ]
+    db.add_all(messages)
+    db.commit()
+    ids = [message.id for message in messages]
+    db.close()
+    return ids
+
+def test_cursor_pages_include_null_sort_values(client):
+    started = datetime(2001, 1, 1)
+    # 两条同一时间（按 id 区分），两条 approved_at 为 NULL（如旧数据）
+    approved_at = [started, started + timedelta(days=1), started + timedelta(days=1), None, started + timedelta(days=2), None]
+    ids = _approved_messages(approved_at)
+
+    pages = _pages(client, "/api/messages", {"limit": 2, "skip": 0, "with_liked": "false", "cursor": ""})
+    seen = [message_id for page in pages for message_id in page]
+    assert len(seen) == len(set(seen))
+    expected = [
+        message_id for _, message_id in sorted(
+            zip(approved_at, ids),
+            key=lambda item: (item[0] is not None, item[0] or datetime.min, item[1]),
+            reverse=True
+        )
+    ]
+    assert [message_id for message_id in seen if message_id in ids] == expected
+    assert all(len(page) == 2 for page in pages[:-1])
+
+def test_cursor_built_from_null_sort_value(client):
+    ids = _approved_messages([None, None, None])
+    response = client.get("/api/messages", params={"cursor": encode_cursor(None, ids[2]), "limit": 100})
+    assert response.status_code == 200
+    returned = [message["id"] for message in response.json()]
+    assert ids[1] in returned and ids[0] in returned and ids[2] not in returned
@@ -0,0 +1,32 @@
+import os
+from core.media_serving import media_file_version
+from core.photo_import import import_photos
+
+def _write_image(media_root: str, relative_path: str) -> None:
+    path = os.path.join(media_root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"not decoded by the importer")
+
+def test_reimport_after_api_delete(client, media_root):
+    _write_image(media_root, "import-test/a.jpg")
+    _write_image(media_root, "import-test/b.jpg")
+    assert import_photos(["import-test"])["import-test"]["inserted"] == 2
+
+    photos = client.get("/api/gallery/photos", params={"limit": 1000}).json()
+    photo_id = next(p["id"] for p in photos if p["file_path"] == "/media/import-test/a.jpg")
+    assert client.delete(f"/api/gallery/photos/{photo_id}").status_code == 200
+
+    # 删除后源文件仍在：重新导入应重新插入，而不是因遗留的 photo_sources 行而失败
+    report = import_photos(["import-test"])["import-test"]
+    assert report["inserted"] == 1
+    assert report["unchanged"] == 1
+
+def test_imported_photo_url_carries_file_version(client, media_root):
+    _write_image(media_root, "version-test/a.jpg")
+    import_photos(["version-test"])
+
+    photos = client.get("/api/gallery/photos", params={"limit": 1000}).json()
+    photo = next(p for p in photos if p["file_path"] == "/media/version-test/a.jpg")
+    version = media_file_version(os.path.join(media_root, "version-test/a.jpg"))
+    assert photo["url"] == f"/media/version-test/a.jpg?v={version}"
@@ -0,0 +1,19 @@
+from core.database import settings
+from core.rate_limit import RateLimiter
+
+def test_invalid_submissions_cost_no_quota(client):
+    for _ in range(settings.message_rate_limit + 2):
+        assert client.post("/api/messages", json={"nickname": "limit"}).status_code == 422
+
+    message = {"nickname": "limit", "content": "a perfectly normal message", "email": ""}
+    for _ in range(settings.message_rate_limit):
+        assert client.post("/api/messages", json=message).status_code == 200
+    response = client.post("/api/messages", json=message)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+def test_sliding_window_limits_per_key():
+    limiter = RateLimiter("test", limit=2, window=60)
+    assert limiter.hit("a") == 0 and limiter.hit("a") == 0
+    assert limiter.hit("a") > 0
+    assert limiter.hit("b") == 0
@@ -235,8 +235,8 @@ function displayPhotos(photos) {
     
     const html = photos.map(photo => `
         <div class="col-lg-3 col-md-4 col-sm-6 mb-4">
-            <div class="card photo-card" onclick="showPhotoModal(${photo.id}, '${photo.title}', '${photo.file_path}', '${photo.description || ''}')">
-                <img src="${API_BASE_URL.replace('/api', '')}${photo.file_path}" class="card-img-top" alt="${photo.title}">
+            <div class="card photo-card" onclick="showPhotoModal(${photo.id}, '${photo.title}', '${photo.url || photo.file_path}', '${photo.description || ''}')">
+                <img src="${API_BASE_URL.replace('/api', '')}${photo.url || photo.file_path}" class="card-img-top" alt="${photo.title}">
                 <div class="card-body">
                     <h6 class="card-title">${photo.title}</h6>
                     <p class="card-text"><small class="text-muted">${getCategoryName(photo.category)}</small></p>
@@ -624,6 +624,7 @@ function setupMessageBoardEvents() {
 
 // 加载留言板页面
 async function loadMessages() {
+    subscribeMessageEvents();
     try {
         await Promise.all([
             loadMessageStats(),
@@ -634,6 +635,33 @@ async function loadMessages() {
     }
 }
 
+// 订阅留言板推送（新留言审核通过、点赞数变化），代替轮询
+let messageEvents = null;
+
+function subscribeMessageEvents() {
+    if (messageEvents || !window.EventSource) return;
+    
+    messageEvents = new EventSource(`${API_BASE_URL}/messages/stream`);
+    
+    const reloadMessages = () => {
+        // 只在留言板页面可见时刷新
+        const page = document.getElementById('messages-page');
+        if (page && page.style.display !== 'none') {
+            loadMessageStats();
+            loadApprovedMessages();
+        }
+    };
+    messageEvents.addEventListener('message_approved', reloadMessages);
+    messageEvents.addEventListener('resync', reloadMessages);
+    messageEvents.addEventListener('likes', event => {
+        const data = JSON.parse(event.data);
+        const likeCount = document.getElementById(`like-count-${data.id}`);
+        if (likeCount) {
+            likeCount.textContent = data.likes_count;
+        }
+    });
+}
+
 // 加载留言统计
 async function loadMessageStats() {
     try {
@@ -712,10 +740,8 @@ function displayMessages(messages) {
     
     container.innerHTML = html;
     
-    // 检查每个留言的点赞状态
-    messages.forEach(message => {
-        checkLikeStatus(message.id);
-    });
+    // 一次请求检查本页所有留言的点赞状态
+    checkLikeStatuses(messages.map(message => message.id));
 }
 
 // 提交留言
@@ -1518,14 +1544,19 @@ async function toggleLike(messageId) {
 }
 
 // 检查点赞状态
-async function checkLikeStatus(messageId) {
+async function checkLikeStatuses(messageIds) {
+    if (!messageIds.length) return;
+    
     try {
-        const response = await axios.get(`${API_BASE_URL}/messages/${messageId}/like-status`);
-        const likeIcon = document.getElementById(`like-icon-${messageId}`);
+        const query = messageIds.map(id => `ids=${id}`).join('&');
+        const response = await axios.get(`${API_BASE_URL}/messages/like-status?${query}`);
         
-        if (likeIcon && response.data.liked) {
-            likeIcon.classList.add('liked');
-        }
+        messageIds.forEach(messageId => {
+            const likeIcon = document.getElementById(`like-icon-${messageId}`);
+            if (likeIcon && response.data[messageId]) {
+                likeIcon.classList.add('liked');
+            }
+        });
     } catch (error) {
         console.error('Error checking like status:', error);
     }